@@ -0,0 +1,81 @@
+"""Сравнение backend-ов хранилища: JSON (write-through / write-back) и SQLite.
+
+Запуск из корня проекта: python -m benchmarks.bench_backends
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Работаем во временной директории, чтобы не трогать настоящие storage/ и logs/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+WORKDIR = tempfile.mkdtemp(prefix="bench_backends_")
+os.chdir(WORKDIR)
+
+import logging
+logging.disable(logging.INFO)
+
+from config.settings import settings
+from storage.database import Database
+from storage.backends.json_backend import JsonBackend
+from storage.backends.sharded_backend import ShardedJsonBackend
+from storage.backends.sqlite_backend import SQLiteBackend
+
+# Сравниваются режимы записи файла users.json: без журнала истории (иначе write-through
+# измеряет дописывание в журнал) и без холодного архива
+settings.JOURNAL_ENABLED = False
+settings.COLD_ARCHIVE_ENABLED = False
+
+USERS = 10_000
+HISTORY_PER_USER = 20
+
+def populate(db: Database):
+    """Заполнить хранилище пользователями с историей"""
+    for user_id in range(USERS):
+        db.backend.insert_user({
+            "user_id": user_id,
+            "username": f"user{user_id}",
+            "first_name": "Test",
+            "favorites": [],
+            "history": [],
+            "created_at": "2025-06-07T14:48:28.559165",
+            "request_count": 0
+        })
+        for i in range(HISTORY_PER_USER):
+            db.backend.append_history(
+                user_id,
+                {"command": "catfact", "content": f"fact {i}", "timestamp": "2025-06-07T14:50:23.209026"},
+                50
+            )
+    db.backend.flush()
+
+def measure(func, requests: int) -> float:
+    """Средняя стоимость одной операции в миллисекундах"""
+    started = time.perf_counter()
+    for i in range(requests):
+        func(i)
+    return (time.perf_counter() - started) * 1000 / requests
+
+def main():
+    backends = {
+        "json write-through": lambda: JsonBackend(os.path.join(WORKDIR, "wt.json"), flush_interval=0),
+        "json write-back": lambda: JsonBackend(os.path.join(WORKDIR, "wb.json"), flush_interval=5),
+        "json sharded x16": lambda: ShardedJsonBackend(os.path.join(WORKDIR, "shards"), 16, flush_interval=0),
+        "sqlite (WAL)": lambda: SQLiteBackend(os.path.join(WORKDIR, "users.db")),
+    }
+    print(f"{USERS} users, {HISTORY_PER_USER} history entries each")
+    print(f"{'backend':>20} | {'add_to_history, ms':>18} | {'get_user, ms':>12} | {'get_stats, ms':>13}")
+    for name, factory in backends.items():
+        db = Database(factory())
+        populate(db)
+        # write-through переписывает весь файл на каждую операцию - меньше повторов
+        requests = 20 if name == "json write-through" else 2_000
+        history_ms = measure(lambda i: db.add_to_history(i % USERS, "catfact", "fact"), requests)
+        get_ms = measure(lambda i: db.get_user(i % USERS), 2_000)
+        stats_ms = measure(lambda i: db.get_stats(), 20)
+        db.close()
+        print(f"{name:>20} | {history_ms:>18.3f} | {get_ms:>12.3f} | {stats_ms:>13.3f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
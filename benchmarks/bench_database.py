@@ -0,0 +1,96 @@
+"""Бенчмарк хранилища пользователей: стоимость одного запроса в зависимости от числа пользователей.
+
+Запуск из корня проекта: python -m benchmarks.bench_database
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Работаем во временной директории, чтобы не трогать настоящие storage/ и logs/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+WORKDIR = tempfile.mkdtemp(prefix="bench_db_")
+os.chdir(WORKDIR)
+
+import logging
+logging.disable(logging.INFO)
+
+from config.settings import settings
+from storage.database import Database
+from storage.backends.json_backend import JsonBackend
+
+# Сравниваются режимы записи файла users.json: без журнала истории (иначе write-through
+# измеряет дописывание в журнал) и без холодного архива
+settings.JOURNAL_ENABLED = False
+settings.COLD_ARCHIVE_ENABLED = False
+
+USER_COUNTS = [1_000, 10_000, 50_000]
+HISTORY_PER_USER = 10
+
+def make_dataset(path: str, users: int):
+    """Сгенерировать users.json с заданным числом пользователей"""
+    now = datetime.now().isoformat()
+    data = {"users": {}, "stats": {"total_users": users, "total_requests": 0, "created_at": now}}
+    for user_id in range(users):
+        data["users"][str(user_id)] = {
+            "user_id": user_id,
+            "username": f"user{user_id}",
+            "first_name": "Test",
+            "favorites": [],
+            "history": [
+                {"command": "catfact", "content": "Cats sleep 70% of their lives.", "timestamp": now}
+                for _ in range(HISTORY_PER_USER)
+            ],
+            "created_at": now,
+            "request_count": HISTORY_PER_USER
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def reload_request(path: str, user_id: int):
+    """Старая схема (нижняя оценка): полный разбор и полная перезапись файла на запрос"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    user = data["users"][str(user_id)]
+    user["history"].append({"command": "catfact", "content": "fact", "timestamp": datetime.now().isoformat()})
+    user["history"] = user["history"][-50:]
+    data["stats"]["total_requests"] += 1
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def db_request(db: Database, user_id: int):
+    """Запрос через Database: get_user + add_to_history, как в /catfact"""
+    db.get_user(user_id)
+    db.add_to_history(user_id, "catfact", "fact")
+
+def measure(func, requests: int) -> float:
+    """Средняя стоимость одного запроса в миллисекундах"""
+    started = time.perf_counter()
+    for i in range(requests):
+        func(i)
+    return (time.perf_counter() - started) * 1000 / requests
+
+def main():
+    print(f"{'users':>8} | {'reload, ms':>11} | {'write-through, ms':>17} | {'write-back, ms':>14}")
+    for users in USER_COUNTS:
+        path = os.path.join(WORKDIR, f"users_{users}.json")
+        make_dataset(path, users)
+        # Чем больше файл, тем меньше повторов для медленных режимов
+        slow_requests = max(5, 20_000 // users)
+        
+        reload_ms = measure(lambda i: reload_request(path, i % users), slow_requests)
+        
+        write_through = Database(JsonBackend(file_path=path, flush_interval=0))
+        write_through_ms = measure(lambda i: db_request(write_through, i % users), slow_requests)
+        
+        write_back = Database(JsonBackend(file_path=path, flush_interval=5, max_dirty_writes=100))
+        write_back_ms = measure(lambda i: db_request(write_back, i % users), 1_000)
+        write_back.close()
+        
+        print(f"{users:>8} | {reload_ms:>11.3f} | {write_through_ms:>17.3f} | {write_back_ms:>14.3f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""Задержка запроса к API: новая сессия на каждый запрос против общей сессии с пулом соединений.
+
+Запросы идут к локальному HTTP-серверу-заглушке, поэтому экономия видна только на
+TCP-соединении; с настоящими API к ней добавляется TLS-рукопожатие и DNS.
+Запуск из корня проекта: python -m benchmarks.bench_http [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import logging
+logging.disable(logging.INFO)
+
+from aiohttp import web
+from services.api_client import APIClient
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+CONCURRENCY = 10
+
+async def start_stub_server() -> tuple:
+    """Заглушка API: отвечает фиксированным фактом"""
+    async def fact(request):
+        return web.json_response({"fact": "Cats sleep 70% of their lives.", "length": 30})
+    app = web.Application()
+    app.router.add_get("/fact", fact)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/fact"
+
+async def measure(url: str, concurrency: int) -> tuple:
+    """Средняя задержка и p95 одного запроса в миллисекундах"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            async with APIClient() as client:
+                await client._make_request(url)
+            latencies.append(time.perf_counter() - started)
+    
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    latencies.sort()
+    return sum(latencies) * 1000 / len(latencies), latencies[int(len(latencies) * 0.95)] * 1000
+
+async def main():
+    runner, url = await start_stub_server()
+    print(f"{REQUESTS} requests to local stub server")
+    print(f"{'mode':>26} | {'mean, ms':>8} | {'p95, ms':>7}")
+    try:
+        for concurrency in (1, CONCURRENCY):
+            # Без общей сессии каждый APIClient открывает и закрывает свою
+            mean, p95 = await measure(url, concurrency)
+            print(f"{f'session per request x{concurrency}':>26} | {mean:>8.3f} | {p95:>7.3f}")
+            
+            await APIClient.open_session()
+            mean, p95 = await measure(url, concurrency)
+            await APIClient.close_session()
+            print(f"{f'pooled session x{concurrency}':>26} | {mean:>8.3f} | {p95:>7.3f}")
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Память на пользователей: словари из users.json против компактных записей UserRecord.
+
+Запуск из корня проекта: python -m benchmarks.bench_models [users] [history_per_user]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage.models import UserRecord
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+HISTORY_PER_USER = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+FAVORITES_PER_USER = 2
+COMMANDS = ("catfact", "joke", "fact")
+
+def build_payload() -> str:
+    """Содержимое users.json с реалистичными пользователями"""
+    users = {}
+    for user_id in range(USERS):
+        users[str(user_id)] = {
+            "user_id": user_id,
+            "username": f"user{user_id}",
+            "first_name": "Test",
+            "favorites": [
+                {"content": f"favorite {i} of {user_id}", "type": "fact", "added_at": "2025-06-07T14:49:01.127413"}
+                for i in range(FAVORITES_PER_USER)
+            ],
+            "history": [
+                {
+                    "command": COMMANDS[i % len(COMMANDS)],
+                    "content": f"content {i} of {user_id}",
+                    "timestamp": f"2025-06-07T14:50:{i % 60:02d}.{user_id % 1000000:06d}"
+                }
+                for i in range(HISTORY_PER_USER)
+            ],
+            "created_at": "2025-06-07T14:48:28.559165",
+            "request_count": HISTORY_PER_USER
+        }
+    return json.dumps({"users": users, "stats": {}}, ensure_ascii=False)
+
+def measure(load) -> tuple:
+    """Пиковая и итоговая память в МБ и время загрузки"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current / 2**20, peak / 2**20, elapsed
+
+def main():
+    payload = build_payload()
+    print(f"{USERS} users, {HISTORY_PER_USER} history entries and {FAVORITES_PER_USER} favorites each")
+    
+    def load_dicts():
+        return json.loads(payload)["users"]
+    
+    def load_records():
+        users = json.loads(payload)["users"]
+        return {int(user_id): UserRecord.from_dict(user) for user_id, user in users.items()}
+    
+    print(f"{'model':>12} | {'resident, MB':>12} | {'peak, MB':>9} | {'load, s':>7}")
+    results = {}
+    for name, load in (("dict", load_dicts), ("UserRecord", load_records)):
+        results[name] = measure(load)
+        current, peak, elapsed = results[name]
+        print(f"{name:>12} | {current:>12.1f} | {peak:>9.1f} | {elapsed:>7.2f}")
+    print(f"memory saved: {1 - results['UserRecord'][0] / results['dict'][0]:.0%}")
+    
+    # Проверяем, что запись переживает преобразование без потерь
+    sample = json.loads(payload)["users"]["0"]
+    assert UserRecord.from_dict(sample).to_dict() == sample
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
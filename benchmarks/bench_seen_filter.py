@@ -0,0 +1,47 @@
+"""Фильтр показанного контента: размер на пользователя против доли ложных срабатываний.
+
+Ложное срабатывание - новый элемент принят за показанный, и пользователь получает
+другой элемент вместо него (повторов при этом не бывает).
+Для сравнения - множество 16-байтных хешей того же числа элементов.
+Запуск из корня проекта: python -m benchmarks.bench_seen_filter [probes]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage.seen_filter import SeenFilter
+
+PROBES = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+CAPACITIES = (50, 100, 200, 500)
+RATES = (0.1, 0.01, 0.001)
+
+def set_size(count: int) -> int:
+    """Память множества из count 16-байтных хешей"""
+    hashes = {os.urandom(16) for _ in range(count)}
+    return sys.getsizeof(hashes) + sum(sys.getsizeof(item) for item in hashes)
+
+def measure(capacity: int, fpr: float) -> tuple:
+    """Размер фильтра, доля ложных срабатываний (оба поколения заполнены) и время проверки"""
+    seen = SeenFilter(capacity=capacity, fpr=fpr)
+    # capacity в предыдущем поколении и capacity в текущем - худший случай
+    for index in range(2 * capacity):
+        seen.add(f"seen item {index}")
+    started = time.perf_counter()
+    false_positives = sum(f"new item {index}" in seen for index in range(PROBES))
+    elapsed = time.perf_counter() - started
+    return len(seen.to_bytes()), false_positives / PROBES, elapsed / PROBES * 1e6
+
+def main():
+    print(f"{PROBES} probes of unseen items per configuration")
+    print(f"{'capacity':>8} | {'target fpr':>10} | {'bytes':>6} | {'measured fpr':>12} | {'check, us':>9} | {'set bytes':>9}")
+    for capacity in CAPACITIES:
+        baseline = set_size(2 * capacity)
+        for fpr in RATES:
+            size, measured, check = measure(capacity, fpr)
+            print(f"{capacity:>8} | {fpr:>10} | {size:>6} | {measured:>12.4f} | {check:>9.2f} | {baseline:>9}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
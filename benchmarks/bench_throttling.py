@@ -0,0 +1,64 @@
+"""Антиспам на большом числе пользователей: время проверки, память корзин и очистка.
+
+Старый вариант (словарь last_request без удаления) для сравнения памяти.
+Запуск из корня проекта: python -m benchmarks.bench_throttling [users]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import logging
+logging.disable(logging.INFO)
+
+from middlewares.throttling import ThrottlingMiddleware
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+def old_memory(users: int) -> int:
+    """Память словаря last_request прежнего middleware"""
+    tracemalloc.start()
+    last_request = {}
+    for user_id in range(users):
+        last_request[user_id] = time.time()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+def main():
+    print(f"{USERS} distinct users, one request each")
+    throttling = ThrottlingMiddleware(sweep_interval=float("inf"))
+    now = 1000.0
+    
+    tracemalloc.start()
+    started = time.perf_counter()
+    for user_id in range(USERS):
+        throttling.allow(user_id, now + user_id * 1e-6)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"allow(): {elapsed / USERS * 1e6:.2f} us per request, buckets: {memory / 2**20:.1f} MB "
+          f"(old last_request dict: {old_memory(USERS) / 2**20:.1f} MB, never shrinks)")
+    
+    # Все корзины наполнились - очистка удаляет их целиком
+    started = time.perf_counter()
+    removed = throttling.sweep(now + 60)
+    print(f"sweep(): removed {removed} idle buckets in {time.perf_counter() - started:.3f} s, "
+          f"left {len(throttling.buckets)}")
+    
+    # Флуд одного пользователя: 1000 запросов за секунду
+    flood = ThrottlingMiddleware(sweep_interval=float("inf"))
+    allowed = warnings = 0
+    for index in range(1000):
+        moment = now + index / 1000
+        if flood.allow(1, moment):
+            allowed += 1
+        elif flood.should_warn(1, moment):
+            warnings += 1
+    print(f"flood of 1000 requests in 1 s: {allowed} allowed, {warnings} warning sent")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""Нагрузочный тест webhook: повтор записанных обновлений на локальный сервер бота.
+
+Обновления берутся из JSONL-файла (по одному объекту Update в строке, например
+из ответа getUpdates), без файла - синтетическая смесь /start, /help, /stats и /favorites
+от разных пользователей. Ответы бота уходят на заглушку Telegram Bot API.
+Подключены middleware и роутер команд из бота. Измеряется задержка ответа webhook
+(то, что видит Telegram), пропускная способность приема и время до обработки всех обновлений.
+Запуск из корня проекта: python -m benchmarks.bench_webhook [updates | file.jsonl] [concurrency]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Работаем во временной директории, чтобы не трогать настоящие storage/ и logs/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+SOURCE = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].isdigit() else None
+WORKDIR = tempfile.mkdtemp(prefix="bench_webhook_")
+os.chdir(WORKDIR)
+
+import logging
+logging.disable(logging.INFO)
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from middlewares.logging_middleware import LoggingMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from routers import commands
+from services.webhook_server import WebhookServer
+from storage.async_database import db
+from storage.fsm_storage import SQLiteStorage
+
+UPDATES = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5000
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+USERS = 1000
+SECRET = "bench-secret"
+TOKEN = "42:bench"
+COMMANDS = ("/start", "/help", "/stats", "/favorites")
+
+def synthetic_updates(count: int) -> list:
+    """Сообщения с командами от USERS пользователей по кругу"""
+    updates = []
+    for index in range(count):
+        user_id = 1000 + index % USERS
+        user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+        updates.append({
+            "update_id": index + 1,
+            "message": {
+                "message_id": index + 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": user,
+                "text": COMMANDS[index // USERS % len(COMMANDS)]
+            }
+        })
+    return updates
+
+def load_updates(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def start_stub_api() -> tuple:
+    """Заглушка Bot API: любой метод успешен, отправка сообщения возвращает сообщение"""
+    calls = {"count": 0}
+    
+    async def method(request):
+        calls["count"] += 1
+        name = request.match_info["method"].lower()
+        if name in ("sendmessage", "editmessagetext"):
+            result = {"message_id": 1, "date": int(time.time()), "chat": {"id": 1, "type": "private"}}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+    
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", method)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}", calls
+
+def make_dispatcher() -> Dispatcher:
+    """То же FSM-хранилище и middleware, что и в bot.py, и роутер команд"""
+    dp = Dispatcher(storage=SQLiteStorage())
+    dp.message.middleware(LoggingMiddleware())
+    dp.callback_query.middleware(LoggingMiddleware())
+    throttling = ThrottlingMiddleware()
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
+    dp.include_router(commands.router)
+    return dp
+
+async def replay(url: str, updates: list, concurrency: int) -> list:
+    """Отправить обновления с секретным токеном, вернуть задержки ответов webhook"""
+    latencies = []
+    queue = iter(updates)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    
+    async def worker(session):
+        for update in queue:
+            started = time.perf_counter()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                assert response.status == 200, response.status
+            latencies.append(time.perf_counter() - started)
+    
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    return latencies
+
+async def main():
+    updates = load_updates(SOURCE) if SOURCE else synthetic_updates(UPDATES)
+    stub, api_base, calls = await start_stub_api()
+    bot = Bot(token=TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_base)))
+    db.start()
+    server = WebhookServer(bot, make_dispatcher(), secret=SECRET)
+    await server.start("127.0.0.1", 0)
+    port = server.runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}{server.path}"
+    print(f"{len(updates)} updates from {SOURCE or 'synthetic mix'}, {CONCURRENCY} concurrent connections")
+    
+    try:
+        async with aiohttp.ClientSession() as session:
+            # Запрос без секрета должен быть отклонен
+            async with session.post(url, json=updates[0]) as response:
+                print(f"request without secret token: HTTP {response.status}")
+            
+            started = time.perf_counter()
+            latencies = await replay(url, updates, CONCURRENCY)
+            accepted = time.perf_counter() - started
+            async with session.get(f"http://127.0.0.1:{port}/health") as response:
+                health = await response.json()
+            while server.pending:
+                await asyncio.sleep(0.01)
+            processed = time.perf_counter() - started
+        
+        latencies.sort()
+        print(f"webhook response: mean {sum(latencies) / len(latencies) * 1000:.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+        print(f"accepted {len(updates) / accepted:.0f} updates/s, all processed in {processed:.2f} s "
+              f"({len(updates) / processed:.0f} updates/s), Bot API calls: {calls['count']}")
+        print(f"/health right after replay: {health}")
+    finally:
+        await server.stop()
+        await server.dp.storage.close()
+        await db.stop()
+        await stub.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -1,7 +1,6 @@
 import asyncio
 import sys
 from aiogram import Bot, Dispatcher, F
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
@@ -10,6 +9,14 @@ from utils.logger import logger
 from middlewares.throttling import ThrottlingMiddleware
 from middlewares.logging_middleware import LoggingMiddleware
 from states.user_states import UserStates
+from storage.async_database import db
+from storage.fsm_storage import SQLiteStorage
+from services.cache_service import cache
+from services.content_pool import pools
+from services.content_corpus import corpus
+from services.api_client import APIClient
+from services.prediction_store import prediction_store
+from services.webhook_server import run_webhook
 
 # Импорт роутеров
 from routers import commands
@@ -22,16 +29,23 @@ async def main():
     if not settings.BOT_TOKEN:
         logger.error("BOT_TOKEN не найден в переменных окружения!")
         sys.exit(1)
+    if settings.BOT_MODE == "webhook" and not settings.WEBHOOK_SECRET:
+        logger.error("WEBHOOK_SECRET не задан: без него webhook принимает запросы от кого угодно")
+        sys.exit(1)
     
     # Создаем бот и диспетчер
     bot = Bot(token=settings.BOT_TOKEN)
-    storage = MemoryStorage()
+    # FSM-состояния в файле: переживают перезапуск и видны всем экземплярам бота
+    storage = SQLiteStorage()
     dp = Dispatcher(storage=storage)
     
     # Подключаем middleware
     dp.message.middleware(LoggingMiddleware())
     dp.callback_query.middleware(LoggingMiddleware())
-    dp.message.middleware(ThrottlingMiddleware())
+    # Один экземпляр: сообщения и нажатия кнопок расходуют общий лимит пользователя
+    throttling = ThrottlingMiddleware()
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
     
     # Подключаем роутеры
     dp.include_router(commands.router)
@@ -131,13 +145,36 @@ async def main():
     
     logger.info("🚀 Бот запускается...")
     
+    # Поток-писатель базы данных: групповая фиксация, сброс на диск и сжатие журнала
+    db.start()
+    # Общая HTTP-сессия для всех запросов к API
+    await APIClient.open_session()
+    # Фоновая очистка истекших записей кэша
+    cache.start()
+    # Прогреваем кэш предсказаниями, сохраненными до перезапуска
+    prediction_store.warm(cache)
+    # Фоновое пополнение запасов фактов и шуток и сбор локального корпуса
+    pools.start()
+    
     try:
-        # Удаляем webhook и запускаем polling
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot)
+        if settings.BOT_MODE == "webhook":
+            # HTTP-сервер принимает обновления от Telegram и передает их тем же роутерам
+            await run_webhook(bot, dp)
+        else:
+            # Удаляем webhook и запускаем polling
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
     except Exception as e:
-        logger.error(f"Ошибка при запуске бота: {e}")
+        logger.error("Ошибка при запуске бота: %s", e)
     finally:
+        await pools.stop()
+        await cache.stop()
+        await APIClient.close_session()
+        prediction_store.close()
+        if corpus is not None:
+            corpus.close()
+        await db.stop()
+        await storage.close()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -146,5 +183,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
     except Exception as e:
-        logger.error(f"Критическая ошибка: {e}")
+        logger.error("Критическая ошибка: %s", e)
         sys.exit(1)
\ No newline at end of file
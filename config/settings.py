@@ -5,6 +5,11 @@ load_dotenv()
 
 class Settings:
     BOT_TOKEN = os.getenv("BOT_TOKEN")
+    # Получение обновлений: polling - один процесс опрашивает Telegram,
+    # webhook - Telegram присылает обновления на HTTP-сервер бота (можно несколько экземпляров)
+    BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling | webhook
+    # ID администраторов через запятую (для служебных команд)
+    ADMIN_IDS = [int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()]
     
     # API URLs
     CAT_FACTS_API = "https://catfact.ninja/fact"
@@ -13,14 +18,160 @@ class Settings:
     AGIFY_API = "https://api.agify.io"
     GENDERIZE_API = "https://api.genderize.io"
     
+    # HTTP client: одна сессия на процесс с пулом keep-alive соединений
+    HTTP_TIMEOUT = 10  # seconds
+    HTTP_POOL_LIMIT = 100  # соединений всего
+    HTTP_LIMIT_PER_HOST = 10
+    HTTP_DNS_CACHE_TTL = 300  # seconds
+    HTTP_KEEPALIVE_TIMEOUT = 30  # seconds
+    
+    # Устойчивость запросов к API
+    # Бюджет времени на весь вызов вместе с повторами; для остальных URL - HTTP_TIMEOUT
+    API_LATENCY_BUDGETS = {
+        CAT_FACTS_API: 3,  # seconds
+        JOKE_API: 3,
+        RANDOM_FACTS_API: 3,
+        AGIFY_API: 5,
+        GENDERIZE_API: 5,
+    }
+    API_MAX_RETRIES = 2  # повторов после первой попытки
+    API_RETRY_BASE_DELAY = 0.2  # seconds, пауза перед повтором - случайная до base * 2^попытка
+    # Предохранитель хоста: после стольких сбоев подряд запросы не отправляются cooldown секунд
+    API_BREAKER_FAILURES = 5
+    API_BREAKER_COOLDOWN = 30  # seconds
+    # Страхующий запрос: если ответа нет дольше p95 задержки хоста, отправляется второй
+    API_HEDGE_ENABLED = False
+    API_HEDGE_MIN_SAMPLES = 20  # замеров задержки до включения страховки
+    # Адаптивный лимит одновременных запросов к хосту: растет, пока ответы быстрее
+    # API_HEALTHY_LATENCY, и уменьшается вдвое при таймаутах, 429 и 5xx
+    API_CONCURRENCY_INITIAL = 4
+    API_CONCURRENCY_MIN = 1
+    API_CONCURRENCY_MAX = HTTP_LIMIT_PER_HOST
+    API_HEALTHY_LATENCY = 1.0  # seconds
+    # Запросы сверх лимита ждут в очереди не дольше API_QUEUE_TIMEOUT, затем отбрасываются
+    API_QUEUE_TIMEOUT = 1.0  # seconds
+    API_QUEUE_MAX = 200
+    
+    # Пакетирование запросов предсказаний (agify/genderize принимают несколько name[])
+    PREDICTION_BATCH_WINDOW = 0.02  # seconds, сколько ждать другие имена
+    PREDICTION_BATCH_SIZE = 10  # имен в одном запросе (лимит API - 10)
+    
+    # Постоянный кэш предсказаний на диске (переживает перезапуск)
+    PREDICTION_STORE_TTL = 30 * 24 * 3600  # seconds
+    PREDICTION_STORE_MAX_ENTRIES = 100000
+    PREDICTION_STORE_WARM_ENTRIES = 5000  # загружается в память при старте
+    PREDICTION_STORE_ACCESS_FLUSH_INTERVAL = 60  # seconds, время обращений для LRU пишется пачкой
+    
     # Cache settings
-    CACHE_TTL = 300  # 5 minutes
+    CACHE_DEFAULT_TTL = 300  # 5 minutes, если TTL не передан в cache.set()
+    # Мягкий TTL: после него значение устарело, но отдается сразу, пока в фоне
+    # идет обновление; жесткий TTL: после него значение удаляется
+    CACHE_CONTENT_TTL = 300  # последний выданный факт/шутка, если запас пуст
+    CACHE_CONTENT_HARD_TTL = 3600
+    CACHE_PREDICTION_TTL = 24 * 3600  # предсказания по имени меняются редко
+    CACHE_PREDICTION_HARD_TTL = 7 * 24 * 3600
+    CACHE_MAX_ENTRIES = 10000
+    CACHE_MAX_BYTES = 8 * 1024 * 1024  # 8 MB
+    CACHE_SWEEP_INTERVAL = 30  # seconds, фоновая очистка истекших записей
+    # Отрицательные записи: имя без предсказания и неудачный запрос к API не повторяются сразу
+    CACHE_NEGATIVE_EMPTY_TTL = 3600  # seconds, API ответил, но результата нет
+    CACHE_NEGATIVE_ERROR_TTL = 15  # seconds, API недоступен или вернул ошибку
+    CACHE_NEGATIVE_MAX_ENTRIES = 5000
+    
+    # Content pools: запас готовых фактов и шуток на каждый тип контента
+    POOL_DEPTH = 20
+    POOL_LOW_WATER = 5  # ниже этого уровня запас пополняется в фоне
+    POOL_REFILL_CONCURRENCY = 3  # одновременных запросов к API при пополнении
+    POOL_RETRY_DELAY = 5  # seconds, пауза, если пополнение ничего не принесло
+    
+    # Локальный корпус контента: факты и шутки выдаются с диска без запросов к API
+    CORPUS_ENABLED = True
+    CORPUS_MIN_ITEMS = 50  # пока элементов меньше, контент этого типа берется из API
+    CORPUS_TARGET_ITEMS = 1000  # до скольких элементов каждого типа корпус собирается в фоне
+    CORPUS_HARVEST_INTERVAL = 1.0  # seconds, пауза между запросами сбора
+    CORPUS_HARVEST_MAX_DUPLICATES = 50  # повторов подряд - API больше ничего нового не отдает
+    
+    # Фильтр показанного контента у каждого пользователя: повтор "🔄 Еще раз" не покажет
+    # тот же факт. Фильтр Блума из двух поколений по SEEN_FILTER_CAPACITY элементов,
+    # SEEN_FILTER_FPR - доля ложных срабатываний на поколение (python -m benchmarks.bench_seen_filter)
+    SEEN_FILTER_CAPACITY = 100
+    SEEN_FILTER_FPR = 0.01
+    SEEN_RETRY_BUDGET = 5  # сколько раз взять другой элемент, если этот уже показан
+    
+    # Webhook (BOT_MODE = "webhook")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # внешний адрес, например https://bot.example.com; пусто - не регистрировать
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # обязателен: Telegram присылает его в каждом запросе
+    WEBHOOK_PATH = "/webhook"
+    WEBHOOK_HEALTH_PATH = "/health"
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_MAX_CONNECTIONS = 40  # одновременных запросов от Telegram
+    # /health отвечает 503, пока столько обновлений ждут обработки - балансировщик шлет трафик другим
+    WEBHOOK_MAX_PENDING = 1000
+    WEBHOOK_SHUTDOWN_TIMEOUT = 10  # seconds, дообработка принятых обновлений при остановке
     
     # Rate limiting
     RATE_LIMIT = 1  # requests per second
+    RATE_BURST = 3  # запросов подряд без ожидания
+    THROTTLE_WARN_INTERVAL = 10  # seconds, не больше одного предупреждения за интервал
+    THROTTLE_SWEEP_INTERVAL = 60  # seconds, удаление корзин простаивающих пользователей
     
     # File paths
     USERS_FILE = "storage/users.json"
+    SQLITE_FILE = "storage/users.db"
+    SHARDS_DIR = "storage/shards"
+    COLD_ARCHIVE_FILE = "storage/cold.db"
+    PREDICTION_STORE_FILE = "storage/predictions.db"
+    CORPUS_FILE = "storage/corpus.db"
+    FSM_STORAGE_FILE = "storage/fsm.db"
     LOG_FILE = "logs/bot.log"
 
+    # Database settings
+    DB_BACKEND = "json"  # json | sharded | sqlite
+    # Число файлов-шардов для DB_BACKEND = "sharded" (изменить - python -m storage.reshard)
+    DB_SHARDS = 16
+    # Данные пользователей держатся в памяти и сбрасываются на диск не реже
+    # чем раз в DB_FLUSH_INTERVAL секунд или каждые DB_MAX_DIRTY_WRITES изменений -
+    # это верхняя граница потерь при аварийном завершении
+    DB_FLUSH_INTERVAL = 5  # seconds, 0 - писать сразу (write-through)
+    DB_MAX_DIRTY_WRITES = 100
+    # Изменения, пришедшие в пределах окна, фиксируются одной записью (group commit)
+    DB_GROUP_COMMIT_WINDOW = 0.01  # seconds
+    
+    # FSM-состояния (ввод имени для предсказания) в файле SQLite: переживают перезапуск
+    # и общие для всех процессов бота, работающих с одной директорией storage/
+    FSM_STATE_TTL = 3600  # seconds, брошенное состояние сбрасывается
+    FSM_CACHE_MAX_ENTRIES = 10000  # состояний в памяти процесса
+    FSM_SWEEP_INTERVAL = 600  # seconds, удаление истекших состояний из файла
+    FSM_BUSY_TIMEOUT = 1.0  # seconds, ожидание записи, пока файл пишет другой процесс
+    
+    # History journal (для хранилища в памяти)
+    JOURNAL_ENABLED = True
+    JOURNAL_DIR = "storage/journal"
+    JOURNAL_SEGMENT_MAX_BYTES = 1024 * 1024  # 1 MB
+    JOURNAL_COMPACT_INTERVAL = 60  # seconds
+    
+    # Cold tier: неактивные пользователи уходят из памяти в сжатый архив
+    # и возвращаются при следующем обращении
+    COLD_ARCHIVE_ENABLED = True
+    COLD_AFTER_DAYS = 30
+    COLD_ARCHIVE_INTERVAL = 3600  # seconds
+    # При архивации история старше этого срока удаляется
+    HISTORY_RETENTION_DAYS = 90
+    
+    # Logging: записи уходят в очередь, в файл и консоль их пишет отдельный поток
+    LOG_LEVEL = "INFO"
+    # Уровни отдельных логгеров по имени модуля, например "services.cache_service": "DEBUG"
+    LOG_LEVELS = {
+        "aiohttp.access": "WARNING",
+    }
+    # Доля записей ниже WARNING, которые попадают в лог, для частых событий
+    LOG_SAMPLING = {
+        "middlewares.logging_middleware": 0.1,  # каждое входящее сообщение и нажатие
+        "aiogram.event": 0.1,  # "Update id=... is handled"
+    }
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # 10 MB, затем файл сжимается в bot.log.1.gz
+    LOG_BACKUP_COUNT = 5
+    LOG_QUEUE_SIZE = 10000  # записей; при переполнении новые записи отбрасываются
+
 settings = Settings()
\ No newline at end of file
@@ -1,10 +1,11 @@
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
+from config.settings import settings
 
 class AdminFilter(BaseFilter):
     def __init__(self, admin_ids: list = None):
-        self.admin_ids = admin_ids or []
+        self.admin_ids = admin_ids or settings.ADMIN_IDS
     
     async def __call__(self, message: Message) -> bool:
-        # Возвращаем False, так как не используем админов
-        return False
\ No newline at end of file
+        # Без настроенных ADMIN_IDS админов нет
+        return message.from_user.id in self.admin_ids
\ No newline at end of file
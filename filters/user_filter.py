@@ -1,13 +1,13 @@
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
-from storage.database import db
+from storage.async_database import db
 
 class RegisteredUserFilter(BaseFilter):
     def __init__(self):
         pass
     
     async def __call__(self, message: Message) -> bool:
-        user = db.get_user(message.from_user.id)
+        user = await db.get_user(message.from_user.id)
         return user is not None
 
 class NewUserFilter(BaseFilter):
@@ -15,5 +15,5 @@ class NewUserFilter(BaseFilter):
         pass
     
     async def __call__(self, message: Message) -> bool:
-        user = db.get_user(message.from_user.id)
+        user = await db.get_user(message.from_user.id)
         return user is None
\ No newline at end of file
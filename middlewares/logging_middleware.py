@@ -1,7 +1,9 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
-from utils.logger import logger
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class LoggingMiddleware(BaseMiddleware):
     async def __call__(
@@ -10,15 +12,13 @@ class LoggingMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
+        # Строка собирается только если запись пройдет уровень и выборку (LOG_SAMPLING)
         if isinstance(event, Message):
-            user_info = f"User {event.from_user.id} (@{event.from_user.username})"
-            message_info = f"Message: {event.text[:50]}..." if event.text and len(event.text) > 50 else f"Message: {event.text}"
-            logger.info(f"{user_info} - {message_info}")
+            text = event.text[:50] + "..." if event.text and len(event.text) > 50 else event.text
+            logger.info("User %s (@%s) - Message: %s", event.from_user.id, event.from_user.username, text)
         
         elif isinstance(event, CallbackQuery):
-            user_info = f"User {event.from_user.id} (@{event.from_user.username})"
-            callback_info = f"Callback: {event.data}"
-            logger.info(f"{user_info} - {callback_info}")
+            logger.info("User %s (@%s) - Callback: %s", event.from_user.id, event.from_user.username, event.data)
         
         result = await handler(event, data)
         return result
\ No newline at end of file
@@ -1,13 +1,85 @@
 import time
+from itertools import takewhile
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Message
+from aiogram.types import TelegramObject, Message, CallbackQuery
 from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self, rate_limit: float = settings.RATE_LIMIT):
-        self.rate_limit = rate_limit
-        self.last_request: Dict[int, float] = {}
+    """Антиспам: корзина токенов на пользователя (rate_limit запросов в секунду, до burst подряд).
+    
+    Корзина хранится одним числом - моментом, когда она снова станет полной (GCRA).
+    Полная корзина ничем не отличается от отсутствующей, поэтому корзины простаивающих
+    пользователей удаляются периодической очисткой и память не растет с числом пользователей.
+    Один экземпляр подключается и к сообщениям, и к callback-запросам.
+    """
+    
+    def __init__(self, rate_limit: float = settings.RATE_LIMIT,
+                 burst: int = settings.RATE_BURST,
+                 warn_interval: float = settings.THROTTLE_WARN_INTERVAL,
+                 sweep_interval: float = settings.THROTTLE_SWEEP_INTERVAL):
+        # Интервал между запросами при равномерной нагрузке
+        self.interval = 1 / rate_limit
+        # Насколько момент полной корзины может уйти вперед - это и есть запас на burst запросов
+        self.tolerance = self.interval * (burst - 1)
+        self.warn_interval = warn_interval
+        self.sweep_interval = sweep_interval
+        # user_id -> момент полной корзины; обычный dict хранит порядок вставки, а ключ
+        # переставляется в конец при каждом обращении - от давно обращавшихся к недавним
+        self.buckets: Dict[int, float] = {}
+        # user_id -> когда можно снова предупредить (только для тех, кого ограничивали)
+        self.warned: Dict[int, float] = {}
+        self._last_sweep = time.monotonic()
+        self.throttled = 0
+        self.warnings = 0
+        self.evicted = 0
+    
+    def allow(self, user_id: int, now: float = None) -> bool:
+        """Взять токен из корзины пользователя; False - запрос нужно отклонить"""
+        now = time.monotonic() if now is None else now
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        buckets = self.buckets
+        full_at = buckets.pop(user_id, now)
+        if full_at < now:
+            full_at = now
+        if full_at - now > self.tolerance:
+            buckets[user_id] = full_at
+            self.throttled += 1
+            return False
+        buckets[user_id] = full_at + self.interval
+        return True
+    
+    def should_warn(self, user_id: int, now: float = None) -> bool:
+        """Не больше одного предупреждения за warn_interval секунд"""
+        now = time.monotonic() if now is None else now
+        if self.warned.get(user_id, 0.0) > now:
+            return False
+        self.warned[user_id] = now + self.warn_interval
+        self.warnings += 1
+        return True
+    
+    def sweep(self, now: float = None) -> int:
+        """Удалить полные корзины и истекшие отметки о предупреждениях, вернуть число корзин"""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        buckets = self.buckets
+        # Спереди - давно обращавшиеся пользователи. Корзина наполняется не позже чем через
+        # burst/rate секунд после обращения, так что остановка на первой неполной оставляет
+        # до следующей очистки только недавно активных
+        idle = [user_id for user_id, _ in takewhile(lambda item: item[1] <= now, buckets.items())]
+        for user_id in idle:
+            del buckets[user_id]
+        removed = len(idle)
+        if self.warned:
+            self.warned = {user_id: until for user_id, until in self.warned.items() if until > now}
+        self.evicted += removed
+        if removed:
+            logger.info("Throttling sweep removed %s idle buckets, %s left", removed, len(buckets))
+        return removed
     
     async def __call__(
         self,
@@ -15,16 +87,23 @@ class ThrottlingMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        if isinstance(event, Message):
+        if isinstance(event, (Message, CallbackQuery)) and event.from_user:
             user_id = event.from_user.id
-            current_time = time.time()
-            
-            if user_id in self.last_request:
-                time_passed = current_time - self.last_request[user_id]
-                if time_passed < self.rate_limit:
+            if not self.allow(user_id):
+                if self.should_warn(user_id):
+                    # Для callback-запроса - всплывающее уведомление вместо нового сообщения
                     await event.answer("⏳ Слишком много запросов! Подождите немного.")
-                    return
-            
-            self.last_request[user_id] = current_time
+                elif isinstance(event, CallbackQuery):
+                    # Без ответа на callback кнопка крутит индикатор загрузки до таймаута
+                    await event.answer()
+                return
         
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buckets": len(self.buckets),
+            "throttled": self.throttled,
+            "warnings": self.warnings,
+            "evicted": self.evicted
+        }
\ No newline at end of file
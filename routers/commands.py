@@ -1,12 +1,14 @@
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
-from storage.database import db
+from storage.async_database import db
 from filters.admin_filter import AdminFilter
 from filters.user_filter import NewUserFilter, RegisteredUserFilter
 from keyboards.inline import get_main_menu
-from utils.formatters import format_stats
-from utils.logger import logger
+from utils.formatters import format_stats, format_stats_check
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = Router()
 
@@ -16,7 +18,7 @@ async def start_new_user(message: Message):
     user = message.from_user
     
     # Создаем пользователя в базе
-    db.create_user(
+    await db.create_user(
         user_id=user.id,
         username=user.username,
         first_name=user.first_name
@@ -33,7 +35,7 @@ async def start_new_user(message: Message):
                    f"Выбери что тебя интересует!"
     
     await message.answer(welcome_text, reply_markup=get_main_menu(), parse_mode="Markdown")
-    logger.info(f"New user registered: {user.id}")
+    logger.info("New user registered: %s", user.id)
 
 @router.message(Command("start"), RegisteredUserFilter())
 async def start_existing_user(message: Message):
@@ -68,11 +70,19 @@ async def help_command(message: Message):
 @router.message(Command("stats"))
 async def stats_command(message: Message):
     """Статистика бота (доступна всем пользователям)"""
-    stats = db.get_stats()
+    stats = await db.get_stats()
     stats_text = format_stats(stats)
     
     await message.answer(stats_text, parse_mode="Markdown")
-    logger.info(f"User {message.from_user.id} requested stats")
+    logger.info("User %s requested stats", message.from_user.id)
+
+@router.message(Command("checkstats"), AdminFilter())
+async def check_stats_command(message: Message):
+    """Пересчет статистики с нуля и отчет о расхождениях (только для админов)"""
+    drift = await db.check_stats(repair=True)
+    
+    await message.answer(format_stats_check(drift), parse_mode="Markdown")
+    logger.info("Admin %s checked stats, drift: %s", message.from_user.id, drift)
 
 @router.message(Command("catfact"))
 async def catfact_command(message: Message):
@@ -109,16 +119,16 @@ async def back_command(message: Message):
 async def history_command(message: Message):
     """Команда просмотра истории"""
     user_id = message.from_user.id
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     
     if not user:
         # Создаем пользователя если его нет
-        db.create_user(
+        await db.create_user(
             user_id=user_id,
             username=message.from_user.username,
             first_name=message.from_user.first_name
         )
-        user = db.get_user(user_id)
+        user = await db.get_user(user_id)
     
     from utils.formatters import format_history
     history_text = format_history(user.get("history", []))
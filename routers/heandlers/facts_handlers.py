@@ -1,53 +1,50 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from config.settings import settings
 from services.api_client import APIClient
 from services.cache_service import cache
-from storage.database import db
+from services.content_pool import pools
+from services.prediction_store import prediction_store, normalize_name
+from storage.async_database import db
 from keyboards.inline import get_add_to_favorites, get_main_menu, get_prediction_menu, get_content_with_back
 from utils.formatters import format_prediction_result
-from utils.logger import logger
+from utils.logger import get_logger
 from states.user_states import UserStates
 
+logger = get_logger(__name__)
+
 router = Router()
 
 async def handle_cat_fact(message_or_callback):
     """Обработка запроса факта о котах"""
     user_id = message_or_callback.from_user.id
     
-    # Проверяем и создаем пользователя если нужно
-    user = db.get_user(user_id)
-    if not user:
-        db.create_user(
-            user_id=user_id,
-            username=message_or_callback.from_user.username,
-            first_name=message_or_callback.from_user.first_name
-        )
-    
-    # Проверяем кэш
-    cached_fact = cache.get("catfact_recent")
-    if cached_fact:
-        fact = cached_fact
-        logger.info("Cat fact served from cache")
-    else:
-        async with APIClient() as client:
-            fact = await client.get_cat_fact()
+    # Все изменения пользователя фиксируются одной записью при выходе из сессии
+    async with db.session(
+        user_id,
+        username=message_or_callback.from_user.username,
+        first_name=message_or_callback.from_user.first_name
+    ) as session:
+        # Проверяем и создаем пользователя если нужно
+        session.get_or_create()
         
-        if fact:
-            cache.set("catfact_recent", fact)
-        else:
+        # Берем готовый факт из запаса, который пополняется в фоне, пропуская уже показанные
+        fact = await pools.get_unseen("catfact", await db.get_seen(user_id))
+        if not fact:
             if isinstance(message_or_callback, Message):
                 await message_or_callback.answer("❌ Не удалось получить факт о котах. Попробуйте позже.")
             else:
                 await message_or_callback.message.edit_text("❌ Не удалось получить факт о котах. Попробуйте позже.")
             return
-    
-    # Сохраняем контент для возможности добавления в избранное
-    from routers.handlers.favorites_handlers import save_last_content
-    save_last_content(user_id, fact)
-    
-    # Сохраняем в историю
-    db.add_to_history(user_id, "catfact", fact)
+        
+        # Сохраняем контент для возможности добавления в избранное
+        from routers.handlers.favorites_handlers import save_last_content
+        save_last_content(user_id, fact)
+        
+        # Сохраняем в историю
+        session.add_history("catfact", fact)
+        session.mark_seen(fact)
     
     response_text = f"🐱 **Факт о котах:**\n\n{fact}"
     keyboard = get_content_with_back("catfact")
@@ -61,39 +58,31 @@ async def handle_random_fact(message_or_callback):
     """Обработка запроса случайного факта"""
     user_id = message_or_callback.from_user.id
     
-    # Проверяем и создаем пользователя если нужно
-    user = db.get_user(user_id)
-    if not user:
-        db.create_user(
-            user_id=user_id,
-            username=message_or_callback.from_user.username,
-            first_name=message_or_callback.from_user.first_name
-        )
-    
-    # Проверяем кэш
-    cached_fact = cache.get("randomfact_recent")
-    if cached_fact:
-        fact = cached_fact
-        logger.info("Random fact served from cache")
-    else:
-        async with APIClient() as client:
-            fact = await client.get_random_fact()
+    # Все изменения пользователя фиксируются одной записью при выходе из сессии
+    async with db.session(
+        user_id,
+        username=message_or_callback.from_user.username,
+        first_name=message_or_callback.from_user.first_name
+    ) as session:
+        # Проверяем и создаем пользователя если нужно
+        session.get_or_create()
         
-        if fact:
-            cache.set("randomfact_recent", fact)
-        else:
+        # Берем готовый факт из запаса, который пополняется в фоне, пропуская уже показанные
+        fact = await pools.get_unseen("randomfact", await db.get_seen(user_id))
+        if not fact:
             if isinstance(message_or_callback, Message):
                 await message_or_callback.answer("❌ Не удалось получить случайный факт. Попробуйте позже.")
             else:
                 await message_or_callback.message.edit_text("❌ Не удалось получить случайный факт. Попробуйте позже.")
             return
-    
-    # Сохраняем контент для возможности добавления в избранное
-    from routers.handlers.favorites_handlers import save_last_content
-    save_last_content(user_id, fact)
-    
-    # Сохраняем в историю
-    db.add_to_history(user_id, "randomfact", fact)
+        
+        # Сохраняем контент для возможности добавления в избранное
+        from routers.handlers.favorites_handlers import save_last_content
+        save_last_content(user_id, fact)
+        
+        # Сохраняем в историю
+        session.add_history("randomfact", fact)
+        session.mark_seen(fact)
     
     response_text = f"🎲 **Случайный факт:**\n\n{fact}"
     keyboard = get_content_with_back("randomfact")
@@ -151,25 +140,30 @@ async def handle_name_prediction(message: Message, prediction_type: str):
     
     user_id = message.from_user.id
     
-    # Проверяем кэш
-    cache_key = f"{prediction_type}_{name.lower()}"
-    cached_result = cache.get(cache_key)
+    cache_key = f"{prediction_type}_{normalize_name(name)}"
     
-    if cached_result:
-        result = cached_result
-        logger.info(f"Prediction {prediction_type} for {name} served from cache")
-    else:
+    async def fetch_prediction():
+        # Сначала постоянный кэш на диске, к API - только если там нет
+        stored = await prediction_store.get(cache_key)
+        if stored:
+            return stored
         async with APIClient() as client:
             if prediction_type == "age":
                 result = await client.get_age_prediction(name)
             else:
                 result = await client.get_gender_prediction(name)
-        
         if result:
-            cache.set(cache_key, result)
-        else:
-            await message.answer("❌ Не удалось получить предсказание. Попробуйте позже.")
-            return
+            await prediction_store.put(cache_key, result)
+        return result
+    
+    # Проверяем кэш; одновременные промахи по одному имени ждут один запрос к API,
+    # а устаревшее предсказание отдается сразу и обновляется в фоне. Имя без предсказания
+    # и ошибка API запоминаются отрицательной записью и не повторяются сразу
+    result = await cache.get_or_fetch(cache_key, fetch_prediction, ttl=settings.CACHE_PREDICTION_TTL,
+                                      hard_ttl=settings.CACHE_PREDICTION_HARD_TTL, negative=True)
+    if not result:
+        await message.answer("❌ Не удалось получить предсказание. Попробуйте позже.")
+        return
     
     # Форматируем результат
     response_text = format_prediction_result(result, prediction_type)
@@ -178,8 +172,14 @@ async def handle_name_prediction(message: Message, prediction_type: str):
     from routers.handlers.favorites_handlers import save_last_content
     save_last_content(user_id, response_text)
     
-    # Сохраняем в историю
-    db.add_to_history(user_id, "prediction", response_text)
+    # Сохраняем в историю (одной записью вместе с созданием пользователя)
+    async with db.session(
+        user_id,
+        username=message.from_user.username,
+        first_name=message.from_user.first_name
+    ) as session:
+        session.get_or_create()
+        session.add_history("prediction", response_text)
     
     keyboard = get_content_with_back("prediction")
     await message.answer(response_text, reply_markup=keyboard, parse_mode="Markdown")
\ No newline at end of file
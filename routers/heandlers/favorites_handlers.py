@@ -1,12 +1,14 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
-from storage.database import db
+from storage.async_database import db
 from keyboards.inline import get_favorites_menu, get_main_menu, get_back_button
 from keyboards.builders import build_favorites_list, build_remove_favorites_list
 from utils.formatters import format_favorites
 from states.user_states import UserStates
-from utils.logger import logger
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = Router()
 
@@ -26,7 +28,7 @@ async def favorites_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "show_favorites")
 async def show_favorites(callback: CallbackQuery):
     """Показать список избранного"""
-    user = db.get_user(callback.from_user.id)
+    user = await db.get_user(callback.from_user.id)
     if not user:
         await callback.answer("❌ Пользователь не найден")
         return
@@ -54,7 +56,7 @@ async def view_favorite(callback: CallbackQuery):
     """Просмотр конкретного избранного элемента"""
     try:
         favorite_index = int(callback.data.split(":")[1])
-        user = db.get_user(callback.from_user.id)
+        user = await db.get_user(callback.from_user.id)
         
         if not user or favorite_index >= len(user.get("favorites", [])):
             await callback.answer("❌ Элемент не найден")
@@ -85,7 +87,7 @@ async def view_favorite(callback: CallbackQuery):
 @router.callback_query(F.data == "remove_favorite")
 async def remove_favorite_menu(callback: CallbackQuery):
     """Меню удаления из избранного"""
-    user = db.get_user(callback.from_user.id)
+    user = await db.get_user(callback.from_user.id)
     if not user:
         await callback.answer("❌ Пользователь не найден")
         return
@@ -115,14 +117,14 @@ async def delete_favorite(callback: CallbackQuery):
         favorite_index = int(callback.data.split(":")[1])
         user_id = callback.from_user.id
         
-        removed_item = db.remove_from_favorites(user_id, favorite_index)
+        removed_item = await db.remove_from_favorites(user_id, favorite_index)
         
         if removed_item:
             await callback.message.edit_text(
                 "✅ Элемент удален из избранного",
                 reply_markup=get_favorites_menu()
             )
-            logger.info(f"User {user_id} removed item from favorites")
+            logger.info("User %s removed item from favorites", user_id)
         else:
             await callback.message.edit_text(
                 "❌ Не удалось удалить элемент",
@@ -147,21 +149,20 @@ async def add_to_favorites(callback: CallbackQuery):
     
     content = last_content[user_id]
     
-    # Проверяем, существует ли пользователь в базе
-    user = db.get_user(user_id)
-    if not user:
-        # Создаем пользователя если его нет
-        db.create_user(
-            user_id=user_id,
-            username=callback.from_user.username,
-            first_name=callback.from_user.first_name
-        )
+    # Создаем пользователя если его нет и добавляем в избранное одной записью
+    async with db.session(
+        user_id,
+        username=callback.from_user.username,
+        first_name=callback.from_user.first_name
+    ) as session:
+        session.get_or_create()
+        session.add_favorite(content, content_type)
     
-    success = db.add_to_favorites(user_id, content, content_type)
+    success = session.results[-1]
     
     if success:
         await callback.answer("✅ Добавлено в избранное!", show_alert=True)
-        logger.info(f"User {user_id} added {content_type} to favorites")
+        logger.info("User %s added %s to favorites", user_id, content_type)
     else:
         await callback.answer("❌ Не удалось добавить в избранное")
 
@@ -1,10 +1,11 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from services.api_client import APIClient
-from services.cache_service import cache
-from storage.database import db
+from services.content_pool import pools
+from storage.async_database import db
 from keyboards.inline import get_add_to_favorites, get_content_with_back
-from utils.logger import logger
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = Router()
 
@@ -12,39 +13,31 @@ async def handle_joke(message_or_callback):
     """Обработка запроса шутки"""
     user_id = message_or_callback.from_user.id
     
-    # Проверяем и создаем пользователя если нужно
-    user = db.get_user(user_id)
-    if not user:
-        db.create_user(
-            user_id=user_id,
-            username=message_or_callback.from_user.username,
-            first_name=message_or_callback.from_user.first_name
-        )
-    
-    # Проверяем кэш
-    cached_joke = cache.get("joke_recent")
-    if cached_joke:
-        joke = cached_joke
-        logger.info("Joke served from cache")
-    else:
-        async with APIClient() as client:
-            joke = await client.get_joke()
+    # Все изменения пользователя фиксируются одной записью при выходе из сессии
+    async with db.session(
+        user_id,
+        username=message_or_callback.from_user.username,
+        first_name=message_or_callback.from_user.first_name
+    ) as session:
+        # Проверяем и создаем пользователя если нужно
+        session.get_or_create()
         
-        if joke:
-            cache.set("joke_recent", joke)
-        else:
+        # Берем готовую шутку из запаса, который пополняется в фоне, пропуская уже показанные
+        joke = await pools.get_unseen("joke", await db.get_seen(user_id))
+        if not joke:
             if isinstance(message_or_callback, Message):
                 await message_or_callback.answer("❌ Не удалось получить шутку. Попробуйте позже.")
             else:
                 await message_or_callback.message.edit_text("❌ Не удалось получить шутку. Попробуйте позже.")
             return
-    
-    # Сохраняем контент для возможности добавления в избранное
-    from routers.handlers.favorites_handlers import save_last_content
-    save_last_content(user_id, joke)
-    
-    # Сохраняем в историю
-    db.add_to_history(user_id, "joke", joke)
+        
+        # Сохраняем контент для возможности добавления в избранное
+        from routers.handlers.favorites_handlers import save_last_content
+        save_last_content(user_id, joke)
+        
+        # Сохраняем в историю
+        session.add_history("joke", joke)
+        session.mark_seen(joke)
     
     response_text = f"😄 **Шутка для вас:**\n\n{joke}"
     keyboard = get_content_with_back("joke")
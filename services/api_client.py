@@ -1,46 +1,192 @@
 import aiohttp
 import asyncio
-from typing import Optional, Dict, Any
-from utils.logger import logger
+import time
+from typing import Optional, Dict, Any, Union, Tuple
+from urllib.parse import urlsplit
+from utils.logger import get_logger
 from config.settings import settings
+from services.single_flight import SingleFlight
+from services.prediction_batcher import PredictionBatcher
+from services.resilience import HostHealth, backoff_delay
+
+logger = get_logger(__name__)
+
+class UpstreamError(Exception):
+    """Запрос к API не удался (в отличие от ответа без результата)"""
 
 class APIClient:
+    # Общая сессия процесса: соединения keep-alive и DNS-кэш переиспользуются всеми клиентами
+    _shared_session: Optional[aiohttp.ClientSession] = None
+    # Одинаковые одновременные запросы уходят в API один раз
+    flight = SingleFlight()
+    # Предохранители и замеры задержек по хостам API
+    _hosts: Dict[str, HostHealth] = {}
+    
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
-        self.timeout = aiohttp.ClientTimeout(total=10)
+        self.timeout = aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT)
+        # Своя сессия создается, только если общая не открыта (скрипты, тесты)
+        self._owns_session = False
+    
+    @classmethod
+    async def open_session(cls) -> aiohttp.ClientSession:
+        """Открыть общую сессию с пулом соединений (при старте бота)"""
+        if cls._shared_session is None or cls._shared_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.HTTP_POOL_LIMIT,
+                limit_per_host=settings.HTTP_LIMIT_PER_HOST,
+                ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT
+            )
+            cls._shared_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT)
+            )
+            logger.info("Shared HTTP session opened")
+        return cls._shared_session
+    
+    @classmethod
+    async def close_session(cls):
+        """Закрыть общую сессию (при остановке бота)"""
+        if cls._shared_session is not None:
+            await cls._shared_session.close()
+            cls._shared_session = None
+            logger.info("Shared HTTP session closed, single-flight stats: %s, "
+                        "prediction batches: age %s, gender %s, hosts: %s",
+                        cls.flight.stats(), age_batcher.stats(), gender_batcher.stats(), cls.metrics())
+    
+    @classmethod
+    def host_health(cls, url: str) -> HostHealth:
+        host = urlsplit(url).netloc
+        health = cls._hosts.get(host)
+        if health is None:
+            health = cls._hosts[host] = HostHealth(host)
+        return health
+    
+    @classmethod
+    def metrics(cls) -> Dict[str, Dict[str, Any]]:
+        """Состояние предохранителей, повторы и задержки по каждому хосту"""
+        return {host: health.metrics() for host, health in cls._hosts.items()}
+    
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if not self.session:
+            shared = APIClient._shared_session
+            if shared is not None and not shared.closed:
+                self.session = shared
+            else:
+                self.session = aiohttp.ClientSession(timeout=self.timeout)
+                self._owns_session = True
+        return self.session
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(timeout=self.timeout)
+        self._ensure_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        # Общую сессию закрывает bot.py при остановке
+        if self.session and self._owns_session:
             await self.session.close()
     
-    async def _make_request(self, url: str, params: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
-        """Базовый метод для выполнения HTTP запросов с обработкой ошибок"""
+    async def _make_request(self, url: str, params: Optional[Union[Dict, list]] = None) -> Optional[Dict[str, Any]]:
+        """Выполнить HTTP запрос в пределах бюджета времени эндпоинта, с повторами"""
+        health = APIClient.host_health(url)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.API_LATENCY_BUDGETS.get(url, settings.HTTP_TIMEOUT)
+        health.requests += 1
+        
+        for attempt in range(settings.API_MAX_RETRIES + 1):
+            if not health.breaker.allow():
+                logger.warning("Circuit open for %s, skipping request to %s", health.breaker.host, url)
+                return None
+            data, retryable = await self._attempt(url, params, health, deadline - loop.time())
+            if data is not None or not retryable:
+                return data
+            
+            # Повтор, только если пауза и хотя бы часть попытки укладываются в бюджет
+            delay = backoff_delay(attempt)
+            if attempt == settings.API_MAX_RETRIES or loop.time() + delay >= deadline:
+                break
+            health.retries += 1
+            await asyncio.sleep(delay)
+        
+        logger.error("API request to %s failed within its latency budget", url)
+        return None
+    
+    async def _attempt(self, url: str, params: Optional[Union[Dict, list]], health: HostHealth,
+                       timeout: float) -> Tuple[Optional[Any], bool]:
+        """Одна попытка; если ответ задерживается дольше p95, параллельно уходит страхующий запрос"""
+        hedge_delay = health.hedge_delay()
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await self._request_once(url, params, health, timeout)
+        
+        primary = asyncio.ensure_future(self._request_once(url, params, health, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+        
+        health.hedges += 1
+        hedge = asyncio.ensure_future(self._request_once(url, params, health, timeout - hedge_delay))
+        pending = {primary, hedge}
+        result = (None, True)
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession(timeout=self.timeout)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result[0] is not None:
+                        return result
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _request_once(self, url: str, params: Optional[Union[Dict, list]], health: HostHealth,
+                            timeout: float) -> Tuple[Optional[Any], bool]:
+        """Выполнить HTTP запрос; возвращает (данные, можно ли повторить)"""
+        # Сверх лимита хоста ждем в очереди; не дождались - отказ без повтора,
+        # вызывающий код отдаст контент из кэша или запаса
+        queued_at = time.monotonic()
+        if not await health.limiter.acquire(min(settings.API_QUEUE_TIMEOUT, timeout)):
+            logger.warning("Concurrency limit for %s reached, request to %s shed", health.breaker.host, url)
+            return None, False
+        started = time.monotonic()
+        timeout -= started - queued_at
+        latency = None
+        overloaded = False
+        try:
+            if timeout <= 0:
+                return None, False
+            session = self._ensure_session()
             
-            async with self.session.get(url, params=params) as response:
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
                 if response.status == 200:
                     data = await response.json()
-                    logger.info(f"Successful API call to {url}")
-                    return data
-                else:
-                    logger.error(f"API request failed with status {response.status} for URL: {url}")
-                    return None
+                    latency = time.monotonic() - started
+                    health.latency.record(latency)
+                    health.breaker.record_success()
+                    logger.debug("Successful API call to %s", url)
+                    return data, False
+                logger.error("API request failed with status %s for URL: %s", response.status, url)
+                # 429 и 5xx - проблема на стороне хоста, остальные ответы повторять бессмысленно
+                if response.status == 429 or response.status >= 500:
+                    overloaded = True
+                    health.breaker.record_failure()
+                    return None, True
+                health.breaker.record_success()
+                return None, False
                     
         except asyncio.TimeoutError:
-            logger.error(f"Timeout error for URL: {url}")
-            return None
+            logger.error("Timeout error for URL: %s", url)
+            overloaded = True
         except aiohttp.ClientError as e:
-            logger.error(f"Client error for URL {url}: {e}")
-            return None
+            logger.error("Client error for URL %s: %s", url, e)
         except Exception as e:
-            logger.error(f"Unexpected error for URL {url}: {e}")
-            return None
+            logger.error("Unexpected error for URL %s: %s", url, e)
+            return None, False
+        finally:
+            health.limiter.release(latency, overloaded, started)
+        health.breaker.record_failure()
+        return None, True
     
     async def get_cat_fact(self) -> Optional[str]:
         """Получить случайный факт о котах"""
@@ -65,13 +211,25 @@ class APIClient:
         return data.get("text") if data else None
     
     async def get_age_prediction(self, name: str) -> Optional[Dict]:
-        """Предсказать возраст по имени"""
-        params = {"name": name}
-        data = await self._make_request(settings.AGIFY_API, params)
+        """Предсказать возраст по имени (None - API не знает имя, UpstreamError - API недоступен)"""
+        # Имена от одновременных пользователей уходят в API одним пакетным запросом
+        data = await APIClient.flight.do(("age", name), lambda: age_batcher.predict(name))
         return data if data and data.get("age") else None
     
     async def get_gender_prediction(self, name: str) -> Optional[Dict]:
-        """Предсказать пол по имени"""
-        params = {"name": name}
-        data = await self._make_request(settings.GENDERIZE_API, params)
+        """Предсказать пол по имени (None - API не знает имя, UpstreamError - API недоступен)"""
+        data = await APIClient.flight.do(("gender", name), lambda: gender_batcher.predict(name))
         return data if data and data.get("gender") else None
+
+async def _batch_request(url: str, params: list) -> Optional[Any]:
+    """Пакетный запрос предсказаний (через общую сессию, если она открыта)"""
+    async with APIClient() as client:
+        data = await client._make_request(url, params)
+    # Ошибка отличается от пустого ответа: ее кэш запоминает на более короткий срок
+    if data is None:
+        raise UpstreamError(f"Prediction request to {url} failed")
+    return data
+
+# Пакетирование запросов предсказаний: по одному на каждый API
+age_batcher = PredictionBatcher(settings.AGIFY_API, _batch_request)
+gender_batcher = PredictionBatcher(settings.GENDERIZE_API, _batch_request)
@@ -1,54 +1,280 @@
+import asyncio
+import heapq
+import json
 import time
-from typing import Optional, Any, Dict
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List, Tuple, Callable, Awaitable
 from config.settings import settings
-from utils.logger import logger
+from services.single_flight import SingleFlight
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def _sizeof(value: Any) -> int:
+    """Примерный размер значения в байтах (для ограничения CACHE_MAX_BYTES)"""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 0
+
+# Причины отрицательных записей: API ответил, но результата нет / запрос к API не удался
+NEGATIVE_EMPTY = "empty"
+NEGATIVE_ERROR = "error"
 
 class CacheService:
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    """LRU-кэш с TTL на каждый ключ и ограничением по числу записей и объему.
+    
+    У записи два срока: после мягкого (ttl) значение считается устаревшим, но еще
+    отдается, пока идет фоновое обновление; после жесткого (hard_ttl) оно удаляется.
+    Отсутствие результата и ошибки API хранятся отдельно (отрицательные записи) с короткими сроками.
+    """
+    
+    def __init__(self, max_entries: int = settings.CACHE_MAX_ENTRIES,
+                 max_bytes: int = settings.CACHE_MAX_BYTES,
+                 default_ttl: float = settings.CACHE_DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> {"data", "stale_at", "expires_at", "size"}; порядок - от давно использованных к недавним
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Куча (expires_at, key) для фоновой очистки; устаревшие элементы пропускаются
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        # Счетчики ведутся на лету, stats() ничего не перебирает
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale_hits = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        # Идущие фоновые обновления устаревших значений
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Одновременные промахи по одному ключу ждут одну загрузку
+        self._flight = SingleFlight()
+        # Отрицательные записи: key -> (причина, expires_at), отдельно от значений и со своим лимитом
+        self._negative: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._negative_heap: List[Tuple[float, str]] = []
+        self.negative_max_entries = settings.CACHE_NEGATIVE_MAX_ENTRIES
+        self.negative_ttls = {
+            NEGATIVE_EMPTY: settings.CACHE_NEGATIVE_EMPTY_TTL,
+            NEGATIVE_ERROR: settings.CACHE_NEGATIVE_ERROR_TTL
+        }
+        # Попадания в отрицательные записи - каждое сэкономило запрос к API
+        self._negative_hits = {NEGATIVE_EMPTY: 0, NEGATIVE_ERROR: 0}
     
-    def _is_expired(self, timestamp: float) -> bool:
-        """Проверить, истек ли срок кэша"""
-        return time.time() - timestamp > settings.CACHE_TTL
+    def _remove(self, key: str) -> None:
+        entry = self._cache.pop(key)
+        self._bytes -= entry["size"]
+    
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Найти запись, не истекшую по жесткому сроку"""
+        entry = self._cache.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if entry["expires_at"] > now:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                if entry["stale_at"] <= now:
+                    self._stale_hits += 1
+                logger.debug("Cache hit for key: %s", key)
+                return entry
+            # Удаляем устаревший кэш
+            self._remove(key)
+            self._expirations += 1
+            logger.debug("Cache expired for key: %s", key)
+        
+        self._misses += 1
+        logger.debug("Cache miss for key: %s", key)
+        return None
     
     def get(self, key: str) -> Optional[Any]:
-        """Получить значение из кэша"""
+        """Получить значение из кэша (устаревшее, но не истекшее - тоже)"""
+        entry = self._lookup(key)
+        return entry["data"] if entry is not None else None
+    
+    def set(self, key: str, value: Any, ttl: float = None, hard_ttl: float = None) -> None:
+        """Сохранить значение: свежее ttl секунд, удаляется через hard_ttl (по умолчанию = ttl)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        hard_ttl = ttl if hard_ttl is None else max(hard_ttl, ttl)
+        size = _sizeof(value)
         if key in self._cache:
-            cache_entry = self._cache[key]
-            if not self._is_expired(cache_entry["timestamp"]):
-                logger.info(f"Cache hit for key: {key}")
-                return cache_entry["data"]
-            else:
-                # Удаляем устаревший кэш
-                del self._cache[key]
-                logger.info(f"Cache expired for key: {key}")
+            self._remove(key)
+        self._negative.pop(key, None)
+        now = time.monotonic()
+        expires_at = now + hard_ttl
+        self._cache[key] = {"data": value, "stale_at": now + ttl, "expires_at": expires_at, "size": size}
+        self._bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._evict()
+        logger.debug("Cache set for key: %s", key)
+    
+    def set_negative(self, key: str, reason: str = NEGATIVE_EMPTY, ttl: float = None) -> None:
+        """Запомнить, что по ключу нет результата (NEGATIVE_EMPTY) или API недоступен (NEGATIVE_ERROR)"""
+        ttl = self.negative_ttls[reason] if ttl is None else ttl
+        if ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        self._negative.pop(key, None)
+        self._negative[key] = (reason, expires_at)
+        heapq.heappush(self._negative_heap, (expires_at, key))
+        while len(self._negative) > self.negative_max_entries:
+            self._negative.popitem(last=False)
+        logger.debug("Cache negative entry (%s) for key: %s", reason, key)
+    
+    def get_negative(self, key: str) -> Optional[str]:
+        """Причина действующей отрицательной записи или None"""
+        item = self._negative.get(key)
+        if item is None:
+            return None
+        reason, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._negative[key]
+            return None
+        self._negative.move_to_end(key)
+        self._negative_hits[reason] += 1
+        logger.debug("Cache negative hit (%s) for key: %s", reason, key)
+        return reason
+    
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                           ttl: float = None, hard_ttl: float = None,
+                           negative: bool = False) -> Optional[Any]:
+        """Получить значение из кэша, а при промахе - загрузить один раз на всех ожидающих.
         
-        logger.info(f"Cache miss for key: {key}")
-        return None
+        Устаревшее значение возвращается сразу, а обновляется в фоне (stale-while-revalidate).
+        С negative=True пустой результат (None) и ошибка загрузки запоминаются отрицательной
+        записью: пока она действует, возвращается None без обращения к fetch, ошибка не пробрасывается.
+        """
+        async def load():
+            try:
+                value = await fetch()
+            except Exception as e:
+                if not negative:
+                    raise
+                logger.error("Cache fetch failed for key %s: %s", key, e)
+                # Устаревшее значение при неудачном обновлении остается до жесткого срока
+                if key not in self._cache:
+                    self.set_negative(key, NEGATIVE_ERROR)
+                return None
+            if value is not None:
+                self.set(key, value, ttl, hard_ttl)
+            elif negative and key not in self._cache:
+                self.set_negative(key, NEGATIVE_EMPTY)
+            return value
+        
+        entry = self._lookup(key)
+        if entry is not None:
+            if entry["stale_at"] <= time.monotonic():
+                self._refresh(key, load)
+            return entry["data"]
+        if negative and self.get_negative(key) is not None:
+            return None
+        return await self._flight.do(key, load)
     
-    def set(self, key: str, value: Any) -> None:
-        """Сохранить значение в кэш"""
-        self._cache[key] = {
-            "data": value,
-            "timestamp": time.time()
-        }
-        logger.info(f"Cache set for key: {key}")
+    def _refresh(self, key: str, load: Callable[[], Awaitable[Any]]) -> None:
+        """Запустить фоновое обновление ключа, если оно еще не идет"""
+        if key in self._refreshing:
+            return
+        task = asyncio.ensure_future(self._flight.do(key, load))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda done: self._refresh_done(key, done))
+    
+    def _refresh_done(self, key: str, task: asyncio.Task) -> None:
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Устаревшее значение остается до жесткого срока
+            logger.error("Cache refresh failed for key %s: %s", key, task.exception())
+    
+    def _evict(self) -> None:
+        """Вытеснить давно не использованные записи сверх лимитов"""
+        while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._cache))
+            self._remove(key)
+            self._evictions += 1
+            logger.debug("Cache evicted key: %s", key)
+    
+    def sweep(self) -> int:
+        """Удалить истекшие записи: O(k log n) для k истекших, вернуть их число"""
+        now = time.monotonic()
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # Ключ мог быть перезаписан с новым сроком или уже вытеснен
+            if entry is not None and entry["expires_at"] == expires_at:
+                self._remove(key)
+                removed += 1
+        # Перезаписанные и вытесненные ключи оставляют в куче мусор - пересобираем ее
+        if len(heap) > 2 * len(self._cache) + 64:
+            self._expiry_heap = [(entry["expires_at"], key) for key, entry in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
+        self._expirations += removed
+        
+        heap = self._negative_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            item = self._negative.get(key)
+            if item is not None and item[1] == expires_at:
+                del self._negative[key]
+        if len(heap) > 2 * len(self._negative) + 64:
+            self._negative_heap = [(expires_at, key) for key, (_, expires_at) in self._negative.items()]
+            heapq.heapify(self._negative_heap)
+        return removed
+    
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.sweep()
+            if removed:
+                logger.info("Cache sweeper removed %s expired entries", removed)
+    
+    def start(self, interval: float = settings.CACHE_SWEEP_INTERVAL) -> None:
+        """Запустить фоновую очистку истекших записей"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(interval))
+    
+    async def stop(self) -> None:
+        """Остановить фоновую очистку и обновления"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        logger.info("Cache stats: %s", self.stats())
     
     def clear(self) -> None:
         """Очистить весь кэш"""
         self._cache.clear()
+        self._expiry_heap.clear()
+        self._negative.clear()
+        self._negative_heap.clear()
+        self._bytes = 0
         logger.info("Cache cleared")
     
-    def stats(self) -> Dict[str, int]:
-        """Получить статистику кэша"""
-        total_entries = len(self._cache)
-        expired_entries = sum(1 for entry in self._cache.values() 
-                            if self._is_expired(entry["timestamp"]))
-        
+    def stats(self) -> Dict[str, Any]:
+        """Получить статистику кэша (O(1))"""
+        requests = self._hits + self._misses
         return {
-            "total_entries": total_entries,
-            "active_entries": total_entries - expired_entries,
-            "expired_entries": expired_entries
+            "total_entries": len(self._cache),
+            "total_bytes": self._bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / requests if requests else 0.0,
+            "stale_hits": self._stale_hits,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            # Сколько загрузок сэкономило объединение одновременных промахов
+            "coalesced": self._flight.coalesced,
+            "negative_entries": len(self._negative),
+            # Запросы к API, которые не были отправлены благодаря отрицательным записям
+            "negative_hits": dict(self._negative_hits),
+            "upstream_saved": sum(self._negative_hits.values())
         }
 
 # Глобальный экземпляр кэша
@@ -0,0 +1,183 @@
+"""Локальный корпус фактов и шуток: выдача без обращения к API.
+
+Корпус пополняется в фоне из API (через запасы контента) или импортом из файла.
+Импорт из корня проекта: python -m services.content_corpus --type joke --file jokes.json
+Файл - JSON-список строк или текст, по одному элементу в строке.
+Запущенный бот увидит импортированные элементы после перезапуска.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import unicodedata
+from array import array
+from typing import Optional, Dict, Iterable, Callable, Awaitable, List
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPES = ("catfact", "randomfact", "joke")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS corpus (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (type, hash)
+);
+"""
+
+def content_hash(text: str) -> bytes:
+    """Хеш нормализованного текста: регистр, юникод-формы и пробелы не создают дубликатов"""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+class ContentCorpus:
+    """Корпус контента в SQLite; id записей каждого типа держатся в памяти
+    компактным массивом для случайной выборки за O(1)"""
+    
+    def __init__(self, file_path: str = None,
+                 target_items: int = settings.CORPUS_TARGET_ITEMS,
+                 min_items: int = settings.CORPUS_MIN_ITEMS):
+        self.file_path = file_path or settings.CORPUS_FILE
+        self.target_items = target_items
+        self.min_items = min_items
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.file_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._ids: Dict[str, array] = {}
+        for content_type, row_id in self._conn.execute("SELECT type, id FROM corpus"):
+            self._ids.setdefault(content_type, array("q")).append(row_id)
+        self._harvesters: Dict[str, asyncio.Task] = {}
+        self.served = 0
+        self.harvested = 0
+        self.duplicates = 0
+        logger.info("Content corpus opened: %s", self.counts())
+    
+    def count(self, content_type: str) -> int:
+        ids = self._ids.get(content_type)
+        return len(ids) if ids is not None else 0
+    
+    def counts(self) -> Dict[str, int]:
+        return {content_type: len(ids) for content_type, ids in self._ids.items()}
+    
+    def add_many(self, content_type: str, items: Iterable[str]) -> int:
+        """Добавить элементы одной транзакцией, пропустив дубликаты; вернуть число новых"""
+        ids = self._ids.setdefault(content_type, array("q"))
+        added = 0
+        with self._conn:
+            for item in items:
+                if not item or not item.strip():
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO corpus (type, hash, text) VALUES (?, ?, ?)",
+                    (content_type, content_hash(item), item.strip())
+                )
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+                    added += 1
+                else:
+                    self.duplicates += 1
+        return added
+    
+    def add(self, content_type: str, item: str) -> bool:
+        return self.add_many(content_type, (item,)) == 1
+    
+    def sample(self, content_type: str) -> Optional[str]:
+        """Случайный элемент; None, если корпус этого типа еще слишком мал"""
+        ids = self._ids.get(content_type)
+        if ids is None or len(ids) < self.min_items:
+            return None
+        row = self._conn.execute("SELECT text FROM corpus WHERE id = ?", (random.choice(ids),)).fetchone()
+        if row is None:
+            return None
+        self.served += 1
+        return row[0]
+    
+    async def _harvest(self, content_type: str, fetch: Callable[[], Awaitable[Optional[str]]]):
+        """Собирать элементы из API, пока корпус не достигнет target_items
+        или API не начнет отдавать только уже известные элементы"""
+        duplicates = 0
+        while self.count(content_type) < self.target_items and duplicates < settings.CORPUS_HARVEST_MAX_DUPLICATES:
+            try:
+                item = await fetch()
+            except Exception as e:
+                logger.error("Corpus harvest for %s failed: %s", content_type, e)
+                item = None
+            if item is None:
+                await asyncio.sleep(settings.POOL_RETRY_DELAY)
+                continue
+            if self.add(content_type, item):
+                self.harvested += 1
+                duplicates = 0
+            else:
+                duplicates += 1
+            # Запросы идут с паузой, чтобы сбор не отнимал лимит API у пользователей
+            await asyncio.sleep(settings.CORPUS_HARVEST_INTERVAL)
+        logger.info("Corpus harvest for %s finished: %s items", content_type, self.count(content_type))
+    
+    def start_harvest(self, content_type: str, fetch: Callable[[], Awaitable[Optional[str]]]):
+        """Запустить фоновый сбор элементов типа content_type"""
+        task = self._harvesters.get(content_type)
+        if task is None or task.done():
+            self._harvesters[content_type] = asyncio.create_task(self._harvest(content_type, fetch))
+    
+    async def stop(self):
+        for task in self._harvesters.values():
+            task.cancel()
+        for task in self._harvesters.values():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._harvesters.clear()
+    
+    def stats(self) -> Dict[str, object]:
+        return {
+            "items": self.counts(),
+            "served": self.served,
+            "harvested": self.harvested,
+            "duplicates": self.duplicates
+        }
+    
+    def close(self):
+        self._conn.close()
+        logger.info("Content corpus closed: %s", self.stats())
+
+def read_items(path: str) -> List[str]:
+    """Элементы из файла: JSON-список строк или текст по строкам"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        return [item for item in json.loads(content) if isinstance(item, str)]
+    return [line for line in content.splitlines() if line.strip()]
+
+# Глобальный корпус контента
+corpus = ContentCorpus() if settings.CORPUS_ENABLED else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт контента в локальный корпус")
+    parser.add_argument("--type", required=True, choices=CONTENT_TYPES)
+    parser.add_argument("--file", required=True)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.file):
+        print(f"Файл {args.file} не найден")
+        sys.exit(1)
+    
+    target = corpus or ContentCorpus()
+    items = read_items(args.file)
+    added = target.add_many(args.type, items)
+    print(f"Добавлено {added} из {len(items)} элементов, в корпусе {args.type}: {target.count(args.type)}")
+    target.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,193 @@
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable, Container
+from config.settings import settings
+from services.api_client import APIClient, UpstreamError
+from services.cache_service import cache
+from services.content_corpus import corpus
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class ContentPool:
+    """Запас готового контента одного типа, пополняемый фоновой задачей"""
+    
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Optional[str]]],
+                 depth: int = settings.POOL_DEPTH,
+                 low_water: int = settings.POOL_LOW_WATER,
+                 concurrency: int = settings.POOL_REFILL_CONCURRENCY):
+        self.name = name
+        # Запрос одного элемента к API (им же собирается локальный корпус)
+        self.fetch = fetch
+        self.depth = depth
+        # Ниже этого уровня запускается пополнение
+        self.low_water = low_water
+        # Сколько запросов к API пополнение делает одновременно
+        self.concurrency = concurrency
+        self._items = deque()
+        # Элементы в запасе и недавно выданные - чтобы пользователи не получали повторы
+        self._known = set()
+        self._served = deque(maxlen=depth)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.starvations = 0
+        self.fetched = 0
+        self.duplicates = 0
+        self.errors = 0
+    
+    async def _fetch_one(self) -> Optional[str]:
+        try:
+            item = await self.fetch()
+        except Exception as e:
+            logger.error("Content pool %s fetch failed: %s", self.name, e)
+            item = None
+        if item is None:
+            self.errors += 1
+        return item
+    
+    async def _fetch_required(self) -> str:
+        item = await self._fetch_one()
+        if item is None:
+            raise UpstreamError(f"Content pool {self.name} fetch returned nothing")
+        return item
+    
+    def _add(self, item: Optional[str]) -> bool:
+        """Положить элемент в запас, если это не повтор"""
+        if item is None:
+            return False
+        if item in self._known:
+            self.duplicates += 1
+            return False
+        self._items.append(item)
+        self._known.add(item)
+        self.fetched += 1
+        return True
+    
+    async def _refill_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while len(self._items) < self.depth:
+                batch = min(self.concurrency, self.depth - len(self._items))
+                results = await asyncio.gather(*(self._fetch_one() for _ in range(batch)))
+                added = sum(self._add(item) for item in results)
+                if not added:
+                    # API недоступен или отдает одно и то же - не долбим его в цикле
+                    await asyncio.sleep(settings.POOL_RETRY_DELAY)
+            logger.info("Content pool %s refilled: %s items", self.name, len(self._items))
+    
+    @property
+    def _fallback_key(self) -> str:
+        return f"{self.name}_recent"
+    
+    async def get(self) -> Optional[str]:
+        """Выдать элемент из запаса за O(1); если запас пуст - последний выданный или запрос к API"""
+        if self._items:
+            item = self._items.popleft()
+            self.hits += 1
+            if len(self._served) == self._served.maxlen:
+                self._known.discard(self._served[0])
+            self._served.append(item)
+            if len(self._items) < self.low_water:
+                self._wakeup.set()
+            # Последний выданный элемент - запасной вариант на случай пустого запаса
+            cache.set(self._fallback_key, item, ttl=settings.CACHE_CONTENT_TTL,
+                      hard_ttl=settings.CACHE_CONTENT_HARD_TTL)
+            return item
+        
+        self.starvations += 1
+        self._wakeup.set()
+        logger.warning("Content pool %s is empty, serving fallback", self.name)
+        # Пока есть пригодное значение, пользователь не ждет API: устаревшее
+        # отдается сразу и обновляется в фоне, запрос идет только при его отсутствии;
+        # после неудачного запроса следующие пользователи CACHE_NEGATIVE_ERROR_TTL секунд не ждут API
+        return await cache.get_or_fetch(self._fallback_key, self._fetch_required, ttl=settings.CACHE_CONTENT_TTL,
+                                        hard_ttl=settings.CACHE_CONTENT_HARD_TTL, negative=True)
+    
+    def start(self):
+        """Запустить фоновое пополнение (первое заполнение - сразу)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refill_loop())
+            self._wakeup.set()
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def stats(self) -> Dict[str, int]:
+        """Метрики запаса"""
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "starvations": self.starvations,
+            "fetched": self.fetched,
+            "duplicates": self.duplicates,
+            "errors": self.errors
+        }
+
+def _api_fetch(method: Callable[[APIClient], Awaitable[Optional[str]]]) -> Callable[[], Awaitable[Optional[str]]]:
+    """Функция получения одного элемента через APIClient"""
+    async def fetch() -> Optional[str]:
+        async with APIClient() as client:
+            return await method(client)
+    return fetch
+
+class ContentPools:
+    """Запасы фактов и шуток по типам контента"""
+    
+    def __init__(self):
+        self.pools: Dict[str, ContentPool] = {
+            "catfact": ContentPool("catfact", _api_fetch(APIClient.get_cat_fact)),
+            "randomfact": ContentPool("randomfact", _api_fetch(APIClient.get_random_fact)),
+            "joke": ContentPool("joke", _api_fetch(APIClient.get_joke)),
+        }
+        # Элементы, пропущенные как уже показанные пользователю
+        self.seen_skips = 0
+    
+    async def get(self, content_type: str) -> Optional[str]:
+        """Получить элемент контента заданного типа: из локального корпуса, а пока он мал - из запаса"""
+        if corpus is not None:
+            item = corpus.sample(content_type)
+            if item is not None:
+                return item
+        return await self.pools[content_type].get()
+    
+    async def get_unseen(self, content_type: str, seen: Container[str],
+                         retries: int = settings.SEEN_RETRY_BUDGET) -> Optional[str]:
+        """Элемент, которого нет в seen; когда попытки кончились - последний полученный"""
+        item = None
+        for _ in range(retries + 1):
+            candidate = await self.get(content_type)
+            if candidate is None:
+                break
+            item = candidate
+            if candidate not in seen:
+                return candidate
+            self.seen_skips += 1
+        return item
+    
+    def start(self):
+        for name, pool in self.pools.items():
+            pool.start()
+            # Корпус собирается теми же запросами к API, что и запас
+            if corpus is not None:
+                corpus.start_harvest(name, pool.fetch)
+    
+    async def stop(self):
+        for pool in self.pools.values():
+            await pool.stop()
+        if corpus is not None:
+            await corpus.stop()
+        logger.info("Content pools stats: %s, seen skips: %s", self.stats(), self.seen_skips)
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+# Глобальные запасы контента
+pools = ContentPools()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PredictionBatcher:
+    """Микро-пакеты запросов к agify/genderize: имена от одновременных пользователей
+    собираются за короткое окно и уходят одним запросом с несколькими name[]"""
+    
+    def __init__(self, url: str, request: Callable[[str, List[tuple]], Awaitable[Any]],
+                 window: float = settings.PREDICTION_BATCH_WINDOW,
+                 max_batch: int = settings.PREDICTION_BATCH_SIZE):
+        self.url = url
+        self._request = request
+        self.window = window
+        self.max_batch = max_batch
+        # Имя -> future с результатом; одинаковые имена в окне отправляются один раз
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending = set()
+        self.batches = 0
+        self.names = 0
+    
+    async def predict(self, name: str) -> Optional[Dict[str, Any]]:
+        """Предсказание для одного имени (ответ API в формате одиночного запроса)"""
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(name)
+        if future is None:
+            future = loop.create_future()
+            self._pending[name] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+    
+    def _flush(self):
+        """Отправить накопленные имена одним запросом"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+    
+    async def _send(self, batch: Dict[str, asyncio.Future]):
+        names = list(batch)
+        self.batches += 1
+        self.names += len(names)
+        try:
+            data = await self._request(self.url, [("name[]", name) for name in names])
+            results = self._match(names, data)
+        except Exception as e:
+            logger.error("Batched prediction request to %s failed: %s", self.url, e)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for name, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(name))
+    
+    @staticmethod
+    def _match(names: List[str], data: Any) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Сопоставить ответы API запрошенным именам"""
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            return {}
+        # API отвечает в порядке запроса; если длина не совпала - ищем по имени
+        if len(data) == len(names):
+            return {name: item if isinstance(item, dict) else None for name, item in zip(names, data)}
+        by_name = {str(item.get("name", "")).lower(): item for item in data if isinstance(item, dict)}
+        return {name: by_name.get(name.lower()) for name in names}
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "names": self.names,
+            "avg_batch": self.names / self.batches if self.batches else 0.0
+        }
\ No newline at end of file
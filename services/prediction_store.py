@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional, Any, Dict
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_access ON predictions(last_access);
+"""
+
+def normalize_name(name: str) -> str:
+    """Ключ имени: NFKC + casefold, чтобы "Anna", "ANNA" и "Ａｎｎａ" попадали в одну запись"""
+    return unicodedata.normalize("NFKC", name).casefold().strip()
+
+class PredictionStore:
+    """Постоянный кэш предсказаний (L2): key-value файл SQLite с TTL и LRU-ограничением"""
+    
+    def __init__(self, file_path: str = None,
+                 ttl: float = settings.PREDICTION_STORE_TTL,
+                 max_entries: int = settings.PREDICTION_STORE_MAX_ENTRIES,
+                 access_flush_interval: float = settings.PREDICTION_STORE_ACCESS_FLUSH_INTERVAL):
+        self.file_path = file_path or settings.PREDICTION_STORE_FILE
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.access_flush_interval = access_flush_interval
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(self.file_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Истекшие записи удаляются при открытии, дальше - при чтении
+        self._conn.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        # key -> время последнего чтения: пишутся в файл пачкой, а не коммитом на каждое чтение
+        self._accessed: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        logger.info("Prediction store opened: %s entries", self._count)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Получить предсказание; SQLite - в пуле потоков, а не в event loop"""
+        return await asyncio.to_thread(self._get, key)
+    
+    async def put(self, key: str, value: Any) -> None:
+        """Сохранить предсказание (в пуле потоков)"""
+        await asyncio.to_thread(self._put, key, value)
+    
+    def _get(self, key: str) -> Optional[Any]:
+        """Прочитать предсказание и запомнить обращение для LRU"""
+        now = time.time()
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM predictions WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._count -= 1
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if time.monotonic() - self._last_access_flush >= self.access_flush_interval:
+                self._flush_access()
+        self.hits += 1
+        return json.loads(row[0])
+    
+    def _flush_access(self):
+        """Записать накопленные времена чтения одной транзакцией (вызывается под lock)"""
+        self._last_access_flush = time.monotonic()
+        if not self._accessed:
+            return
+        accessed, self._accessed = self._accessed, {}
+        # Запись, перезаписанная после чтения, уже хранит более позднее время
+        self._conn.executemany(
+            "UPDATE predictions SET last_access = MAX(last_access, ?) WHERE key = ?",
+            [(moment, key) for key, moment in accessed.items()]
+        )
+        self._conn.commit()
+    
+    def _put(self, key: str, value: Any) -> None:
+        """Сохранить предсказание, вытеснив давно не использованные записи сверх лимита"""
+        now = time.time()
+        with self.lock:
+            exists = self._conn.execute("SELECT 1 FROM predictions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now)
+            )
+            if not exists:
+                self._count += 1
+            if self._count > self.max_entries:
+                # Порядок вытеснения - по актуальным временам обращения
+                self._flush_access()
+                evicted = self._conn.execute(
+                    "DELETE FROM predictions WHERE key IN ("
+                    "SELECT key FROM predictions ORDER BY last_access LIMIT ?)",
+                    (self._count - self.max_entries,)
+                ).rowcount
+                self._count -= evicted
+            self._conn.commit()
+    
+    def warm(self, cache, limit: int = settings.PREDICTION_STORE_WARM_ENTRIES) -> int:
+        """Загрузить недавно использованные предсказания в кэш в памяти (при старте)"""
+        with self.lock:
+            self._flush_access()
+            rows = self._conn.execute(
+                "SELECT key, value FROM predictions WHERE expires_at > ? ORDER BY last_access DESC LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        # Самые свежие кладем последними - они дольше проживут в LRU
+        for key, value in reversed(rows):
+            cache.set(key, json.loads(value), ttl=settings.CACHE_PREDICTION_TTL,
+                      hard_ttl=settings.CACHE_PREDICTION_HARD_TTL)
+        logger.info("Prediction cache warmed with %s entries", len(rows))
+        return len(rows)
+    
+    def stats(self) -> Dict[str, int]:
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses}
+    
+    def close(self):
+        with self.lock:
+            self._flush_access()
+            self._conn.close()
+        logger.info("Prediction store closed: %s", self.stats())
+
+# Глобальный постоянный кэш предсказаний
+prediction_store = PredictionStore()
\ No newline at end of file
@@ -0,0 +1,203 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Any
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def backoff_delay(attempt: int, base: float = settings.API_RETRY_BASE_DELAY) -> float:
+    """Пауза перед повтором: случайная в [0, base * 2^attempt] (full jitter)"""
+    return random.uniform(0, base * 2 ** attempt)
+
+class CircuitBreaker:
+    """Предохранитель хоста: после серии сбоев запросы сразу отклоняются,
+    через cooldown пропускается одна пробная попытка"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, host: str,
+                 failure_threshold: int = settings.API_BREAKER_FAILURES,
+                 cooldown: float = settings.API_BREAKER_COOLDOWN):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+    
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к хосту"""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # Пробная попытка, которая так и не завершилась (отменена), не блокирует хост навсегда
+        if self.state == self.HALF_OPEN and (not self._probe_in_flight or now - self.opened_at >= self.cooldown):
+            self._probe_in_flight = True
+            self.opened_at = now
+            return True
+        self.rejected += 1
+        return False
+    
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Circuit for %s closed", self.host)
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Circuit for %s opened after %s failures", self.host, self.failures)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+class LatencyTracker:
+    """Задержки последних успешных запросов к хосту (для p95)"""
+    
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+    
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+    
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+class AdaptiveLimiter:
+    """Лимит одновременных запросов к хосту (AIMD): растет на 1 за "окно" быстрых ответов
+    и уменьшается вдвое при таймаутах, 429 и 5xx; сверх лимита запросы ждут в очереди"""
+    
+    def __init__(self, initial: int = settings.API_CONCURRENCY_INITIAL,
+                 min_limit: int = settings.API_CONCURRENCY_MIN,
+                 max_limit: int = settings.API_CONCURRENCY_MAX,
+                 healthy_latency: float = settings.API_HEALTHY_LATENCY,
+                 max_queue: int = settings.API_QUEUE_MAX):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.healthy_latency = healthy_latency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self.queued = 0
+        self.shed = 0
+        self.decreases = 0
+    
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+    
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+    
+    async def acquire(self, timeout: float) -> bool:
+        """Занять слот, подождав в очереди не дольше timeout; False - запрос нужно отбросить"""
+        if self._has_slot() and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue or timeout <= 0:
+            self.shed += 1
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        try:
+            # shield: по таймауту отменяется ожидание, а future остается, чтобы проверить передачу слота
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if future.done():
+                return True
+            self._drop_waiter(future)
+            self.shed += 1
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(None, started=time.monotonic())
+            else:
+                self._drop_waiter(future)
+            raise
+    
+    def _drop_waiter(self, future: asyncio.Future):
+        future.cancel()
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+    
+    def release(self, latency: Optional[float], overloaded: bool = False, started: float = 0.0):
+        """Освободить слот и подстроить лимит: latency - время успешного ответа (None - без оценки),
+        started - time.monotonic() начала запроса"""
+        in_use = self.in_flight
+        self.in_flight -= 1
+        if overloaded:
+            # Одна перегрузка дает сбой сразу нескольким запросам: сбои запросов,
+            # начатых до последнего снижения, лимит повторно не режут
+            if started > self._last_decrease:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+        elif latency is not None and latency <= self.healthy_latency and in_use >= int(self.limit):
+            # Растем, только когда лимит действительно выбран
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._wake()
+    
+    def _wake(self):
+        while self._waiters and self._has_slot():
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(True)
+
+class HostHealth:
+    """Состояние одного хоста: предохранитель, задержки и счетчики"""
+    
+    def __init__(self, host: str):
+        self.breaker = CircuitBreaker(host)
+        self.latency = LatencyTracker()
+        self.limiter = AdaptiveLimiter()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Через сколько отправлять страхующий запрос (p95 задержки), None - не страховать"""
+        if not settings.API_HEDGE_ENABLED:
+            return None
+        return self.latency.percentile(0.95, settings.API_HEDGE_MIN_SAMPLES)
+    
+    def metrics(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "rejected": self.breaker.rejected,
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "queue_depth": self.limiter.queue_depth,
+            "queued": self.limiter.queued,
+            "shed": self.limiter.shed,
+            "limit_decreases": self.limiter.decreases
+        }
\ No newline at end of file
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """Объединение одновременных запросов: по каждому ключу выполняется один вызов,
+    остальные ждут его результат (или его ошибку)"""
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Реальные вызовы и запросы, получившие результат чужого вызова
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнить func() или дождаться уже идущего вызова с тем же ключом"""
+        task = self._inflight.get(key)
+        if task is None:
+            # Вызов идет отдельной задачей: отмена одного ожидающего не прерывает его для остальных
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+    
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Ошибку могли не забрать, если все ожидающие отменены
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
\ No newline at end of file
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Set
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class FeedRequestHandler(SimpleRequestHandler):
+    """Проверяет секрет, сразу отвечает Telegram и обрабатывает обновление в своей фоновой задаче"""
+    
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret_token: str):
+        super().__init__(dispatcher=dispatcher, bot=bot, secret_token=secret_token)
+        # Принятые, но еще не обработанные обновления
+        self.tasks: Set[asyncio.Task] = set()
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        update = await request.json(loads=bot.session.json_loads)
+        task = asyncio.create_task(self.feed(bot, update))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+    
+    async def feed(self, bot: Bot, update: dict):
+        result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+        # Хендлер может вернуть метод API как ответ на webhook - выполняем его сами
+        if isinstance(result, TelegramMethod):
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
+
+class WebhookServer:
+    """Прием обновлений от Telegram через webhook вместо long polling.
+    
+    Обновление проверяется по секретному токену (заголовок X-Telegram-Bot-Api-Secret-Token)
+    и передается тому же Dispatcher, что и при polling. Telegram сразу получает ответ 200,
+    а обработка идет в фоне. Экземпляров может быть несколько за балансировщиком:
+    каждый обрабатывает то, что пришло к нему, а /health показывает, готов ли он принимать.
+    """
+    
+    def __init__(self, bot: Bot, dp: Dispatcher,
+                 secret: str = settings.WEBHOOK_SECRET,
+                 path: str = settings.WEBHOOK_PATH,
+                 health_path: str = settings.WEBHOOK_HEALTH_PATH,
+                 max_pending: int = settings.WEBHOOK_MAX_PENDING):
+        self.bot = bot
+        self.dp = dp
+        self.path = path
+        self.max_pending = max_pending
+        self.handler = FeedRequestHandler(dispatcher=dp, bot=bot, secret_token=secret)
+        self.app = web.Application()
+        self.handler.register(self.app, path=path)
+        self.app.router.add_get(health_path, self.health)
+        # Запуск и остановка диспетчера (startup/shutdown хендлеры) вместе с приложением
+        setup_application(self.app, dp, bot=bot)
+        self.runner = None
+        self._started = time.monotonic()
+    
+    @property
+    def pending(self) -> int:
+        """Обновления, принятые, но еще не обработанные"""
+        return len(self.handler.tasks)
+    
+    async def health(self, request: web.Request) -> web.Response:
+        """Проверка для балансировщика: 503, если очередь обработки переполнена"""
+        pending = self.pending
+        overloaded = pending >= self.max_pending
+        return web.json_response({
+            "status": "overloaded" if overloaded else "ok",
+            "pending_updates": pending,
+            "uptime": round(time.monotonic() - self._started, 1)
+        }, status=503 if overloaded else 200)
+    
+    async def start(self, host: str = settings.WEBHOOK_HOST, port: int = settings.WEBHOOK_PORT):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        logger.info("Webhook server listening on %s:%s%s", host, port, self.path)
+    
+    async def stop(self):
+        if self.runner is not None:
+            # Сначала дообрабатываем принятые обновления: при остановке сессия бота закрывается
+            tasks = self.handler.tasks
+            if tasks:
+                await asyncio.wait(set(tasks), timeout=settings.WEBHOOK_SHUTDOWN_TIMEOUT)
+            await self.runner.cleanup()
+            self.runner = None
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Запустить сервер и при заданном WEBHOOK_URL зарегистрировать webhook в Telegram"""
+    server = WebhookServer(bot, dp)
+    await server.start()
+    try:
+        if settings.WEBHOOK_URL:
+            # Повторная регистрация того же адреса другим экземпляром ничего не меняет
+            await bot.set_webhook(
+                url=settings.WEBHOOK_URL + settings.WEBHOOK_PATH,
+                secret_token=settings.WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS
+            )
+            logger.info("Webhook registered: %s%s", settings.WEBHOOK_URL, settings.WEBHOOK_PATH)
+        # Работаем до отмены (Ctrl+C); webhook не удаляется - остальные экземпляры продолжают прием
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
\ No newline at end of file
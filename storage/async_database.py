@@ -0,0 +1,200 @@
+import asyncio
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Callable
+from config.settings import settings
+from storage.database import Database, db as database
+from storage.seen_filter import SeenFilter
+from storage.session import UserSession
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Сигнал остановки потока-писателя
+_STOP = object()
+
+def _resolve(future: asyncio.Future, result: Any = None, error: BaseException = None):
+    """Завершить future в event loop (если ожидающий еще не отменил его)"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+class AsyncDatabase:
+    """Неблокирующий фасад над Database: изменения выполняет один поток-писатель"""
+    
+    def __init__(self, database: Database, commit_window: float = settings.DB_GROUP_COMMIT_WINDOW):
+        self.database = database
+        # Все изменения, пришедшие за это окно, фиксируются одной записью
+        self.commit_window = commit_window
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._last_flush = time.monotonic()
+        self._last_compact = time.monotonic()
+        # Первая архивация - сразу после старта
+        self._last_archive = 0.0
+    
+    def start(self):
+        """Запустить поток-писатель"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+            self._thread.start()
+    
+    async def stop(self):
+        """Дождаться записи всех изменений и закрыть базу"""
+        if self._thread is None:
+            self.database.close()
+            return
+        self._queue.put(_STOP)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+    
+    async def _submit(self, func: Callable, *args, **kwargs) -> Any:
+        """Передать изменение писателю и дождаться его фиксации"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((func, args, kwargs, future, loop))
+        return await future
+    
+    async def _read(self, func: Callable, *args) -> Any:
+        """Чтение: из памяти - сразу, с диска - в пуле потоков"""
+        if self.database.backend.in_memory:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    def _writer_loop(self):
+        """Поток-писатель: собирает изменения в пачки и фиксирует каждую пачку один раз"""
+        running = True
+        while running:
+            try:
+                first = self._queue.get(timeout=1)
+            except queue.Empty:
+                self._maintenance()
+                continue
+            
+            batch = []
+            if first is _STOP:
+                running = False
+            else:
+                batch.append(first)
+                # Групповая фиксация: ждем остальные изменения в пределах окна
+                deadline = time.monotonic() + self.commit_window
+                while True:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        running = False
+                        break
+                    batch.append(item)
+            
+            if batch:
+                self._apply_batch(batch)
+            self._maintenance()
+        
+        self.database.close()
+        logger.info("Database writer stopped")
+    
+    def _apply_batch(self, batch: List[tuple]):
+        """Выполнить пачку изменений с одной фиксацией и разбудить ожидающих"""
+        results = []
+        try:
+            with self.database.group_commit():
+                for func, args, kwargs, future, loop in batch:
+                    try:
+                        results.append((func(*args, **kwargs), None))
+                    except Exception as e:
+                        logger.error("Database operation %s failed: %s", func.__name__, e)
+                        results.append((None, e))
+        except Exception as e:
+            # Не удалось зафиксировать пачку - сообщаем об ошибке всем
+            logger.error("Database group commit failed: %s", e)
+            results = [(None, e)] * len(batch)
+        
+        for (func, args, kwargs, future, loop), (result, error) in zip(batch, results):
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+    
+    def _maintenance(self):
+        """Периодический сброс на диск, сжатие журнала и архивация - тоже в потоке-писателе"""
+        now = time.monotonic()
+        # В режиме write-through (интервал 0) изменения уже на диске, сброс только отдает
+        # архиву вернувшихся из него пользователей
+        if now - self._last_flush >= settings.DB_FLUSH_INTERVAL:
+            self._last_flush = now
+            self.database.flush()
+        if self.database.journal and now - self._last_compact >= settings.JOURNAL_COMPACT_INTERVAL:
+            self._last_compact = now
+            try:
+                self.database.compact()
+            except Exception as e:
+                logger.error("Journal compaction failed: %s", e)
+        if self.database.archive and now - self._last_archive >= settings.COLD_ARCHIVE_INTERVAL:
+            self._last_archive = now
+            try:
+                self.database.archive_inactive()
+            except Exception as e:
+                logger.error("Archiving inactive users failed: %s", e)
+    
+    @asynccontextmanager
+    async def session(self, user_id: int, username: str = None, first_name: str = None):
+        """Единица работы: изменения внутри блока уходят писателю одной операцией"""
+        session = UserSession(user_id, username, first_name)
+        yield session
+        if session.operations:
+            await self._submit(self.database.apply_session, session)
+    
+    async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получить данные пользователя"""
+        user = await self._read(self.database.get_user, user_id, False)
+        if user is None and self.database.archive:
+            # Пользователь мог уйти в холодный архив - возвращает его поток-писатель
+            user = await self._submit(self.database.get_user, user_id)
+        return user
+    
+    async def get_seen(self, user_id: int) -> SeenFilter:
+        """Фильтр контента, который пользователь уже видел"""
+        return await self._read(self.database.get_seen, user_id)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Получить статистику"""
+        return await self._read(self.database.get_stats)
+    
+    async def get_all_users(self) -> List[Dict[str, Any]]:
+        """Получить всех пользователей"""
+        return await self._read(self.database.get_all_users)
+    
+    async def create_user(self, user_id: int, username: str = None, first_name: str = None):
+        """Создать нового пользователя"""
+        return await self._submit(self.database.create_user, user_id, username, first_name)
+    
+    async def update_user(self, user_id: int, updates: Dict[str, Any]):
+        """Обновить данные пользователя"""
+        return await self._submit(self.database.update_user, user_id, updates)
+    
+    async def add_to_favorites(self, user_id: int, item: str, item_type: str):
+        """Добавить элемент в избранное"""
+        return await self._submit(self.database.add_to_favorites, user_id, item, item_type)
+    
+    async def remove_from_favorites(self, user_id: int, index: int):
+        """Удалить элемент из избранного"""
+        return await self._submit(self.database.remove_from_favorites, user_id, index)
+    
+    async def add_to_history(self, user_id: int, command: str, content: str):
+        """Добавить запись в историю"""
+        return await self._submit(self.database.add_to_history, user_id, command, content)
+    
+    async def check_stats(self, repair: bool = True) -> Dict[str, Dict[str, int]]:
+        """Пересчитать счетчики с нуля и вернуть расхождения"""
+        return await self._submit(self.database.check_stats, repair)
+
+# Глобальный асинхронный фасад над базой данных
+db = AsyncDatabase(database)
\ No newline at end of file
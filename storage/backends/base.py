@@ -0,0 +1,109 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Iterator
+from storage.models import encode_seen, decode_seen, last_activity
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища пользователей"""
+    
+    # Все данные в памяти процесса, на диск попадают снимками
+    in_memory = False
+    
+    def __init__(self):
+        # Защищает данные при доступе из event loop и потока-писателя
+        self.lock = threading.RLock()
+    
+    # Мутирующие методы только изменяют состояние, фиксирует его commit().
+    # Database вызывает commit() один раз на каждую логическую операцию.
+    
+    @abstractmethod
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получить пользователя в формате users.json"""
+    
+    @abstractmethod
+    def insert_user(self, user_data: Dict[str, Any]) -> None:
+        """Добавить нового пользователя"""
+    
+    @abstractmethod
+    def update_user(self, user_id: int, updates: Dict[str, Any]) -> bool:
+        """Обновить поля пользователя"""
+    
+    @abstractmethod
+    def delete_user(self, user_id: int) -> bool:
+        """Удалить пользователя вместе с избранным и историей"""
+    
+    @abstractmethod
+    def append_history(self, user_id: int, item: Dict[str, Any], limit: int) -> Optional[int]:
+        """Добавить запись в историю, оставив последние limit записей; вернуть новый request_count"""
+    
+    @abstractmethod
+    def add_favorite(self, user_id: int, item: Dict[str, Any]) -> bool:
+        """Добавить элемент в избранное"""
+    
+    @abstractmethod
+    def remove_favorite(self, user_id: int, index: int) -> Optional[Dict[str, Any]]:
+        """Удалить элемент избранного по индексу"""
+    
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить сохраненные счетчики общей статистики"""
+    
+    @abstractmethod
+    def increment_stat(self, name: str, delta: int = 1) -> None:
+        """Увеличить счетчик общей статистики"""
+    
+    @abstractmethod
+    def set_stat(self, name: str, value: Any) -> None:
+        """Установить значение общей статистики"""
+    
+    @abstractmethod
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        """Перебрать всех пользователей"""
+    
+    @abstractmethod
+    def commit(self) -> None:
+        """Зафиксировать изменения, сделанные с момента прошлого commit()"""
+    
+    def compute_aggregates(self) -> Dict[str, int]:
+        """Посчитать агрегаты полным проходом по пользователям"""
+        aggregates = {"total_users": 0, "active_users": 0, "total_requests": 0, "total_favorites": 0}
+        for user in self.iter_users():
+            aggregates["total_users"] += 1
+            aggregates["active_users"] += user.get("request_count", 0) > 0
+            aggregates["total_requests"] += user.get("request_count", 0)
+            aggregates["total_favorites"] += len(user.get("favorites", []))
+        return aggregates
+    
+    def get_seen(self, user_id: int) -> Optional[bytes]:
+        """Фильтр показанного пользователю контента"""
+        user = self.get_user(user_id)
+        return decode_seen(user.get("seen")) if user else None
+    
+    def set_seen(self, user_id: int, data: bytes) -> bool:
+        """Сохранить фильтр показанного контента"""
+        return self.update_user(user_id, {"seen": encode_seen(data)})
+    
+    def has_user(self, user_id: int) -> bool:
+        """Есть ли пользователь в хранилище"""
+        return self.get_user(user_id) is not None
+    
+    def user_ids(self) -> List[int]:
+        """Идентификаторы всех пользователей"""
+        return [user["user_id"] for user in self.iter_users()]
+    
+    def last_active(self, user_id: int) -> Optional[str]:
+        """Время последней активности пользователя (ISO-строка)"""
+        user = self.get_user(user_id)
+        return last_activity(user) if user else None
+    
+    def get_all_users(self) -> List[Dict[str, Any]]:
+        """Получить всех пользователей списком"""
+        return list(self.iter_users())
+    
+    def flush(self) -> bool:
+        """Принудительно сохранить все изменения на диск, вернуть успех"""
+        return True
+    
+    def close(self) -> None:
+        """Сохранить изменения и освободить ресурсы"""
+        self.flush()
\ No newline at end of file
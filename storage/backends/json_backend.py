@@ -0,0 +1,239 @@
+import json
+import os
+from typing import Dict, Any, Optional, Iterator, List, Tuple
+from datetime import datetime
+from config.settings import settings
+from storage.backends.base import StorageBackend
+from storage.models import UserRecord, HistoryEntry, FavoriteItem
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class JsonBackend(StorageBackend):
+    """Хранилище в одном JSON-файле: данные в памяти, запись на диск с отложенным сбросом"""
+    
+    in_memory = True
+    
+    def __init__(self, file_path: str = None,
+                 flush_interval: float = settings.DB_FLUSH_INTERVAL,
+                 max_dirty_writes: int = settings.DB_MAX_DIRTY_WRITES):
+        super().__init__()
+        self.file_path = file_path or settings.USERS_FILE
+        # 0 - режим write-through: каждое изменение сразу пишется на диск
+        self.flush_interval = flush_interval
+        # Сколько несохраненных изменений допускается до принудительного сброса
+        self.max_dirty_writes = max_dirty_writes
+        self._dirty_writes = 0
+        self._ensure_storage_dir()
+        # Данные загружаются один раз при старте и дальше живут в памяти
+        # компактными записями, а не словарями
+        self._data = self._to_records(self._read_file())
+    
+    def _ensure_storage_dir(self):
+        """Создать директорию storage если её нет"""
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+    
+    def _initial_data(self) -> Dict[str, Any]:
+        """Начальная структура базы данных"""
+        return {
+            "users": {},
+            "stats": {
+                "total_users": 0,
+                "total_requests": 0,
+                "created_at": datetime.now().isoformat()
+            }
+        }
+    
+    def _init_database(self) -> Dict[str, Any]:
+        """Инициализировать базу данных"""
+        data = self._initial_data()
+        try:
+            self._write_file(data)
+            logger.info("Database initialized successfully")
+        except Exception as e:
+            logger.error("Error initializing database: %s", e)
+        return data
+    
+    def _read_file(self) -> Dict[str, Any]:
+        """Прочитать данные из файла (только при старте)"""
+        try:
+            if not os.path.exists(self.file_path):
+                # Если файла нет, создаем его с начальными данными
+                return self._init_database()
+            
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            if not content:
+                # Если файл пустой, инициализируем заново
+                logger.warning("Database file is empty, reinitializing...")
+                return self._init_database()
+            
+            data = json.loads(content)
+            logger.info("Database loaded: %s users", len(data.get('users', {})))
+            return data
+        except json.JSONDecodeError as e:
+            logger.error("Error loading database: %s", e)
+            # При ошибке создаем новую базу
+            return self._init_database()
+        except Exception as e:
+            logger.error("Unexpected error loading database: %s", e)
+            return self._initial_data()
+    
+    def _to_records(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Заменить словари пользователей записями UserRecord"""
+        users = data.get("users", {})
+        return {
+            "users": {int(user_id): UserRecord.from_dict(user) for user_id, user in users.items()},
+            "stats": data.get("stats", {})
+        }
+    
+    def _dump(self, users: List[Tuple[int, UserRecord]], stats: Dict[str, Any]) -> str:
+        """Сериализовать снимок данных в формат users.json"""
+        # Пользователи сериализуются по одному, без промежуточного словаря на всю базу
+        users = ", ".join(
+            f'"{user_id}": {json.dumps(record.to_dict(), ensure_ascii=False)}'
+            for user_id, record in users
+        )
+        stats = json.dumps(stats, ensure_ascii=False)
+        return f'{{"users": {{{users}}}, "stats": {stats}}}'
+    
+    def _write_file(self, data: Dict[str, Any]):
+        """Атомарно записать данные в файл"""
+        self._write_payload(json.dumps(data, ensure_ascii=False))
+    
+    def _write_payload(self, payload: str, file_path: str = None):
+        """Атомарно записать готовый JSON в файл"""
+        file_path = file_path or self.file_path
+        # Создаем временный файл для безопасного сохранения
+        temp_file = file_path + '.tmp'
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            
+            # Заменяем основной файл только если запись прошла успешно
+            os.replace(temp_file, file_path)
+        except Exception:
+            # Удаляем временный файл если что-то пошло не так
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+    
+    def _get(self, user_id: int) -> Optional[UserRecord]:
+        """Запись пользователя в памяти (изменяется на месте)"""
+        return self._data["users"].get(int(user_id))
+    
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        # Отдаем новый словарь: запись может меняться потоком-писателем
+        record = self._get(user_id)
+        if record is None:
+            return None
+        return record.to_dict()
+    
+    def insert_user(self, user_data: Dict[str, Any]) -> None:
+        self._data["users"][int(user_data["user_id"])] = UserRecord.from_dict(user_data)
+    
+    def update_user(self, user_id: int, updates: Dict[str, Any]) -> bool:
+        record = self._get(user_id)
+        if record is None:
+            return False
+        record.update(updates)
+        return True
+    
+    def delete_user(self, user_id: int) -> bool:
+        return self._data["users"].pop(int(user_id), None) is not None
+    
+    def has_user(self, user_id: int) -> bool:
+        return self._get(user_id) is not None
+    
+    def user_ids(self) -> List[int]:
+        return list(self._data["users"])
+    
+    def last_active(self, user_id: int) -> Optional[str]:
+        record = self._get(user_id)
+        return record.last_active() if record is not None else None
+    
+    def get_seen(self, user_id: int) -> Optional[bytes]:
+        record = self._get(user_id)
+        return record.seen if record is not None else None
+    
+    def set_seen(self, user_id: int, data: bytes) -> bool:
+        record = self._get(user_id)
+        if record is None:
+            return False
+        record.seen = data
+        return True
+    
+    def append_history(self, user_id: int, item: Dict[str, Any], limit: int) -> Optional[int]:
+        record = self._get(user_id)
+        if record is None:
+            return None
+        record.history.append(HistoryEntry.from_dict(item), limit)
+        record.request_count += 1
+        return record.request_count
+    
+    def add_favorite(self, user_id: int, item: Dict[str, Any]) -> bool:
+        record = self._get(user_id)
+        if record is None:
+            return False
+        record.favorites.append(FavoriteItem.from_dict(item))
+        return True
+    
+    def remove_favorite(self, user_id: int, index: int) -> Optional[Dict[str, Any]]:
+        record = self._get(user_id)
+        if record is None or not 0 <= index < len(record.favorites):
+            return None
+        return record.favorites.pop(index).to_dict()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._data.get("stats", {}))
+    
+    def increment_stat(self, name: str, delta: int = 1) -> None:
+        stats = self._data["stats"]
+        stats[name] = stats.get(name, 0) + delta
+    
+    def set_stat(self, name: str, value: Any) -> None:
+        self._data["stats"][name] = value
+    
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        for user_id in list(self._data["users"]):
+            user = self.get_user(user_id)
+            if user is not None:
+                yield user
+    
+    def compute_aggregates(self) -> Dict[str, int]:
+        """Агрегаты по записям напрямую, без построения словарей"""
+        aggregates = {"total_users": 0, "active_users": 0, "total_requests": 0, "total_favorites": 0}
+        for record in list(self._data["users"].values()):
+            aggregates["total_users"] += 1
+            aggregates["active_users"] += record.request_count > 0
+            aggregates["total_requests"] += record.request_count
+            aggregates["total_favorites"] += len(record.favorites)
+        return aggregates
+    
+    def commit(self) -> None:
+        """Отметить изменение и сбросить на диск, если исчерпан лимит"""
+        with self.lock:
+            self._dirty_writes += 1
+        if not self.flush_interval or self._dirty_writes >= self.max_dirty_writes:
+            self.flush()
+    
+    def flush(self) -> bool:
+        """Сохранить несохраненные изменения в файл"""
+        # Под блокировкой берется только список записей и копия статистики. Сериализация
+        # идет без нее: сбрасывает поток-писатель, единственный, кто меняет записи, а
+        # чтения из event loop не ждут, пока вся база превращается в JSON
+        with self.lock:
+            if not self._dirty_writes:
+                return True
+            users = list(self._data["users"].items())
+            stats = dict(self._data["stats"])
+            dirty_writes, self._dirty_writes = self._dirty_writes, 0
+        try:
+            self._write_payload(self._dump(users, stats))
+            logger.debug("Database saved successfully")
+            return True
+        except Exception as e:
+            with self.lock:
+                self._dirty_writes += dirty_writes
+            logger.error("Error saving database: %s", e)
+            return False
\ No newline at end of file
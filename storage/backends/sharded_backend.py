@@ -0,0 +1,166 @@
+import json
+import os
+import zlib
+from typing import Dict, Any, Optional, List, Tuple
+from config.settings import settings
+from storage.backends.json_backend import JsonBackend
+from storage.models import UserRecord
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STATS_FILE = "stats.json"
+
+def shard_of(user_id: int, shards: int) -> int:
+    """Номер шарда пользователя (стабильный хеш, не зависит от запуска)"""
+    return zlib.crc32(str(user_id).encode()) % shards
+
+class ShardedJsonBackend(JsonBackend):
+    """Пользователи разложены по N JSON-файлам по хешу user_id, статистика - в отдельном файле.
+    
+    Изменение пользователя переписывает только его шард, а не всю базу.
+    """
+    
+    def __init__(self, directory: str = None, shards: int = None,
+                 flush_interval: float = settings.DB_FLUSH_INTERVAL,
+                 max_dirty_writes: int = settings.DB_MAX_DIRTY_WRITES):
+        self.directory = directory or settings.SHARDS_DIR
+        self.shards = shards or settings.DB_SHARDS
+        # Шарды, измененные с последнего сброса на диск
+        self._dirty_shards = set()
+        super().__init__(os.path.join(self.directory, STATS_FILE), flush_interval, max_dirty_writes)
+    
+    def _shard_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"users-{index:03d}.json")
+    
+    def _read_file(self) -> Dict[str, Any]:
+        """Прочитать файл статистики и все шарды (только при старте)"""
+        if not os.path.exists(self.file_path):
+            return self._init_database()
+        
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        shards = meta.get("shards", self.shards)
+        if shards != self.shards:
+            # Пользователи разложены под другое число шардов - работаем с тем, что на диске
+            logger.warning("Storage has %s shards, DB_SHARDS is %s: run python -m storage.reshard", shards, self.shards)
+            self.shards = shards
+        
+        users = {}
+        for index in range(self.shards):
+            path = self._shard_path(index)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    users.update(json.load(f))
+            except json.JSONDecodeError as e:
+                # Переинициализация затерла бы пользователей шарда при следующем сбросе
+                logger.error("Error loading shard %s: %s", path, e)
+                raise
+        logger.info("Database loaded: %s users in %s shards", len(users), self.shards)
+        return {"users": users, "stats": meta.get("stats", {})}
+    
+    def _to_records(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        data = super()._to_records(data)
+        # Те же записи, разложенные по шардам: сброс шарда не перебирает всю базу
+        self._members = [{} for _ in range(self.shards)]
+        for user_id, record in data["users"].items():
+            self._members[shard_of(user_id, self.shards)][user_id] = record
+        return data
+    
+    def _dump_stats(self, stats: Dict[str, Any]) -> str:
+        return json.dumps({"shards": self.shards, "stats": stats}, ensure_ascii=False)
+    
+    def _dump_shard(self, users: List[Tuple[int, UserRecord]]) -> str:
+        users = ", ".join(
+            f'"{user_id}": {json.dumps(record.to_dict(), ensure_ascii=False)}'
+            for user_id, record in users
+        )
+        return f'{{{users}}}'
+    
+    def _write_file(self, data: Dict[str, Any]):
+        """Записать файл статистики новой базы (шарды появятся при первом сбросе)"""
+        self._write_payload(self._dump_stats(data.get("stats", {})))
+    
+    def _write_payloads(self, payloads: Dict[str, str]):
+        """Записать все файлы во временные копии, затем подменить их разом"""
+        # Подмена идет после того, как все данные уже на диске: окно, в котором
+        # шарды и статистика (с номером события журнала) расходятся, минимально
+        for path, payload in payloads.items():
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(payload)
+        for path in payloads:
+            os.replace(path + '.tmp', path)
+    
+    def _touch(self, user_id: int):
+        self._dirty_shards.add(shard_of(int(user_id), self.shards))
+    
+    def insert_user(self, user_data: Dict[str, Any]) -> None:
+        user_id = int(user_data["user_id"])
+        record = UserRecord.from_dict(user_data)
+        self._data["users"][user_id] = record
+        self._members[shard_of(user_id, self.shards)][user_id] = record
+        self._touch(user_id)
+    
+    def update_user(self, user_id: int, updates: Dict[str, Any]) -> bool:
+        if not super().update_user(user_id, updates):
+            return False
+        self._touch(user_id)
+        return True
+    
+    def delete_user(self, user_id: int) -> bool:
+        if not super().delete_user(user_id):
+            return False
+        self._members[shard_of(int(user_id), self.shards)].pop(int(user_id), None)
+        self._touch(user_id)
+        return True
+    
+    def append_history(self, user_id: int, item: Dict[str, Any], limit: int) -> Optional[int]:
+        request_count = super().append_history(user_id, item, limit)
+        if request_count is not None:
+            self._touch(user_id)
+        return request_count
+    
+    def add_favorite(self, user_id: int, item: Dict[str, Any]) -> bool:
+        if not super().add_favorite(user_id, item):
+            return False
+        self._touch(user_id)
+        return True
+    
+    def remove_favorite(self, user_id: int, index: int) -> Optional[Dict[str, Any]]:
+        removed_item = super().remove_favorite(user_id, index)
+        if removed_item is not None:
+            self._touch(user_id)
+        return removed_item
+    
+    def set_seen(self, user_id: int, data: bytes) -> bool:
+        if not super().set_seen(user_id, data):
+            return False
+        self._touch(user_id)
+        return True
+    
+    def flush(self) -> bool:
+        """Сохранить измененные шарды и файл статистики"""
+        with self.lock:
+            if not self._dirty_writes:
+                return True
+            shards = sorted(self._dirty_shards)
+            # Как и в JsonBackend: под блокировкой - только снимок, сериализация без нее
+            members = {index: list(self._members[index].items()) for index in shards}
+            stats = dict(self._data["stats"])
+            dirty_writes, self._dirty_writes = self._dirty_writes, 0
+            self._dirty_shards = set()
+        try:
+            payloads = {self._shard_path(index): self._dump_shard(users) for index, users in members.items()}
+            # Статистика пишется последней: она хранит номер последнего события журнала
+            payloads[self.file_path] = self._dump_stats(stats)
+            self._write_payloads(payloads)
+            logger.debug("Database saved: %s of %s shards", len(shards), self.shards)
+            return True
+        except Exception as e:
+            with self.lock:
+                self._dirty_writes += dirty_writes
+                self._dirty_shards.update(shards)
+            logger.error("Error saving database: %s", e)
+            return False
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import sqlite3
+from typing import Dict, List, Any, Optional, Iterator
+from datetime import datetime
+from config.settings import settings
+from storage.backends.base import StorageBackend
+from storage.models import encode_seen, decode_seen
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    created_at TEXT NOT NULL,
+    request_count INTEGER NOT NULL DEFAULT 0,
+    seen BLOB
+);
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    type TEXT NOT NULL,
+    added_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_favorites_user ON favorites(user_id, added_at);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    command TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_user ON history(user_id, timestamp);
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+USER_COLUMNS = ("username", "first_name", "created_at", "request_count")
+
+class SQLiteBackend(StorageBackend):
+    """Хранилище в SQLite (WAL): пользователи, избранное и история в отдельных таблицах"""
+    
+    def __init__(self, file_path: str = None):
+        super().__init__()
+        self.file_path = file_path or settings.SQLITE_FILE
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        # Соединение общее для event loop и потока-писателя, доступ - под self.lock
+        self._conn = sqlite3.connect(self.file_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        # База, созданная до появления фильтра показанного контента
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(users)")}
+        if "seen" not in columns:
+            self._conn.execute("ALTER TABLE users ADD COLUMN seen BLOB")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO stats (key, value) VALUES ('created_at', ?)",
+            (datetime.now().isoformat(),)
+        )
+        self._conn.commit()
+        logger.info("SQLite database opened: %s", self.file_path)
+    
+    def _compose_user(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Собрать запись пользователя в формате users.json"""
+        user_id = row["user_id"]
+        favorites = self._conn.execute(
+            "SELECT content, type, added_at FROM favorites WHERE user_id = ? ORDER BY id",
+            (user_id,)
+        ).fetchall()
+        history = self._conn.execute(
+            "SELECT command, content, timestamp FROM history WHERE user_id = ? ORDER BY timestamp, id",
+            (user_id,)
+        ).fetchall()
+        user = {
+            "user_id": user_id,
+            "username": row["username"],
+            "first_name": row["first_name"],
+            "favorites": [dict(item) for item in favorites],
+            "history": [dict(item) for item in history],
+            "created_at": row["created_at"],
+            "request_count": row["request_count"]
+        }
+        if row["seen"]:
+            user["seen"] = encode_seen(row["seen"])
+        return user
+    
+    def _insert_favorites(self, user_id: int, favorites):
+        self._conn.executemany(
+            "INSERT INTO favorites (user_id, content, type, added_at) VALUES (?, ?, ?, ?)",
+            [(user_id, f["content"], f["type"], f["added_at"]) for f in favorites]
+        )
+    
+    def _insert_history(self, user_id: int, history):
+        self._conn.executemany(
+            "INSERT INTO history (user_id, command, content, timestamp) VALUES (?, ?, ?, ?)",
+            [(user_id, h["command"], h["content"], h["timestamp"]) for h in history]
+        )
+    
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return self._compose_user(row) if row else None
+    
+    def insert_user(self, user_data: Dict[str, Any]) -> None:
+        user_id = user_data["user_id"]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO users (user_id, username, first_name, created_at, request_count, seen) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, user_data.get("username"), user_data.get("first_name"),
+             user_data["created_at"], user_data.get("request_count", 0), decode_seen(user_data.get("seen")))
+        )
+        self._insert_favorites(user_id, user_data.get("favorites", []))
+        self._insert_history(user_id, user_data.get("history", []))
+    
+    def update_user(self, user_id: int, updates: Dict[str, Any]) -> bool:
+        exists = self._conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if not exists:
+            return False
+        columns = [column for column in USER_COLUMNS if column in updates]
+        if columns:
+            assignments = ", ".join(f"{column} = ?" for column in columns)
+            self._conn.execute(
+                f"UPDATE users SET {assignments} WHERE user_id = ?",
+                [updates[column] for column in columns] + [user_id]
+            )
+        if "seen" in updates:
+            self._conn.execute("UPDATE users SET seen = ? WHERE user_id = ?",
+                               (decode_seen(updates["seen"]), user_id))
+        if "favorites" in updates:
+            self._conn.execute("DELETE FROM favorites WHERE user_id = ?", (user_id,))
+            self._insert_favorites(user_id, updates["favorites"])
+        if "history" in updates:
+            self._conn.execute("DELETE FROM history WHERE user_id = ?", (user_id,))
+            self._insert_history(user_id, updates["history"])
+        return True
+    
+    def delete_user(self, user_id: int) -> bool:
+        # Избранное и история удаляются каскадом
+        return self._conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,)).rowcount > 0
+    
+    def has_user(self, user_id: int) -> bool:
+        return self._conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+    
+    def user_ids(self) -> List[int]:
+        return [row[0] for row in self._conn.execute("SELECT user_id FROM users")]
+    
+    def last_active(self, user_id: int) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT MAX(created_at, "
+            "COALESCE((SELECT MAX(timestamp) FROM history WHERE user_id = ?), ''), "
+            "COALESCE((SELECT MAX(added_at) FROM favorites WHERE user_id = ?), '')) "
+            "FROM users WHERE user_id = ?",
+            (user_id, user_id, user_id)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def get_seen(self, user_id: int) -> Optional[bytes]:
+        row = self._conn.execute("SELECT seen FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return row["seen"] if row else None
+    
+    def set_seen(self, user_id: int, data: bytes) -> bool:
+        return self._conn.execute("UPDATE users SET seen = ? WHERE user_id = ?", (data, user_id)).rowcount > 0
+    
+    def append_history(self, user_id: int, item: Dict[str, Any], limit: int) -> Optional[int]:
+        updated = self._conn.execute(
+            "UPDATE users SET request_count = request_count + 1 WHERE user_id = ?", (user_id,)
+        ).rowcount
+        if not updated:
+            return None
+        self._insert_history(user_id, [item])
+        # Удаляем все, что старше последних limit записей
+        self._conn.execute(
+            "DELETE FROM history WHERE id IN ("
+            "SELECT id FROM history WHERE user_id = ? "
+            "ORDER BY timestamp DESC, id DESC LIMIT -1 OFFSET ?)",
+            (user_id, limit)
+        )
+        return self._conn.execute(
+            "SELECT request_count FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+    
+    def add_favorite(self, user_id: int, item: Dict[str, Any]) -> bool:
+        exists = self._conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if not exists:
+            return False
+        self._insert_favorites(user_id, [item])
+        return True
+    
+    def remove_favorite(self, user_id: int, index: int) -> Optional[Dict[str, Any]]:
+        if index < 0:
+            return None
+        row = self._conn.execute(
+            "SELECT id, content, type, added_at FROM favorites WHERE user_id = ? "
+            "ORDER BY id LIMIT 1 OFFSET ?",
+            (user_id, index)
+        ).fetchone()
+        if not row:
+            return None
+        self._conn.execute("DELETE FROM favorites WHERE id = ?", (row["id"],))
+        return {"content": row["content"], "type": row["type"], "added_at": row["added_at"]}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {"total_users": 0, "total_requests": 0}
+        stats.update({row["key"]: row["value"] for row in self._conn.execute("SELECT key, value FROM stats")})
+        return stats
+    
+    def compute_aggregates(self) -> Dict[str, int]:
+        row = self._conn.execute(
+            "SELECT COUNT(*) AS total_users, "
+            "COALESCE(SUM(request_count > 0), 0) AS active_users, "
+            "COALESCE(SUM(request_count), 0) AS total_requests, "
+            "(SELECT COUNT(*) FROM favorites) AS total_favorites "
+            "FROM users"
+        ).fetchone()
+        return dict(row)
+    
+    def increment_stat(self, name: str, delta: int = 1) -> None:
+        self._conn.execute(
+            "INSERT INTO stats (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (name, delta)
+        )
+    
+    def set_stat(self, name: str, value: Any) -> None:
+        self._conn.execute(
+            "INSERT INTO stats (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (name, value)
+        )
+    
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        rows = self._conn.execute("SELECT * FROM users ORDER BY user_id").fetchall()
+        for row in rows:
+            yield self._compose_user(row)
+    
+    def commit(self) -> None:
+        with self.lock:
+            self._conn.commit()
+    
+    def flush(self) -> bool:
+        self.commit()
+        return True
+    
+    def close(self) -> None:
+        with self.lock:
+            self._conn.commit()
+            self._conn.close()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    user_id INTEGER PRIMARY KEY,
+    last_active TEXT NOT NULL,
+    request_count INTEGER NOT NULL,
+    favorites INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+class ColdArchive:
+    """Холодный архив неактивных пользователей: zlib-сжатые записи в SQLite.
+    
+    Рядом с записью хранятся счетчики, чтобы check_stats не распаковывал архив.
+    """
+    
+    def __init__(self, file_path: str = None):
+        self.file_path = file_path or settings.COLD_ARCHIVE_FILE
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(self.file_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+    
+    def put_many(self, users: List[Tuple[Dict[str, Any], str]]):
+        """Сохранить пользователей с датой последней активности одной транзакцией"""
+        rows = [
+            (
+                user["user_id"], last_active, user.get("request_count", 0), len(user.get("favorites", [])),
+                zlib.compress(json.dumps(user, ensure_ascii=False).encode('utf-8'))
+            )
+            for user, last_active in users
+        ]
+        with self.lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archive (user_id, last_active, request_count, favorites, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+    
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Распаковать запись пользователя"""
+        with self.lock:
+            row = self._conn.execute("SELECT data FROM archive WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+    
+    def delete_many(self, user_ids: List[int]):
+        """Удалить пользователей одной транзакцией"""
+        with self.lock:
+            self._conn.executemany("DELETE FROM archive WHERE user_id = ?", [(user_id,) for user_id in user_ids])
+            self._conn.commit()
+    
+    def summaries(self) -> Iterator[Tuple[int, int, int]]:
+        """(user_id, request_count, число избранного) по всем архивным пользователям"""
+        with self.lock:
+            rows = self._conn.execute("SELECT user_id, request_count, favorites FROM archive").fetchall()
+        return iter(rows)
+    
+    def count(self) -> int:
+        """Число пользователей в архиве"""
+        with self.lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+    
+    def close(self):
+        with self.lock:
+            self._conn.close()
+        logger.info("Cold archive closed")
\ No newline at end of file
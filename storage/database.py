@@ -1,88 +1,297 @@
-import json
-import os
-import shutil
+from contextlib import contextmanager
+from functools import wraps
 from typing import Dict, List, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from config.settings import settings
-from utils.logger import logger
+from storage.backends.base import StorageBackend
+from storage.cold_archive import ColdArchive
+from storage.journal import HistoryJournal
+from storage.models import last_activity
+from storage.seen_filter import SeenFilter
+from storage.session import UserSession
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Сколько последних записей истории хранится у пользователя
+HISTORY_LIMIT = 50
+
+# Счетчики, которые поддерживаются инкрементально и могут быть пересчитаны с нуля
+AGGREGATES = ("total_users", "active_users", "total_requests", "total_favorites")
+
+# Сколько пользователей переносится в архив под одной блокировкой
+ARCHIVE_BATCH = 500
+
+# Сколько пользователей проверяется на неактивность под одной блокировкой
+ARCHIVE_SCAN_BATCH = 1000
+
+def create_backend(name: str = None) -> StorageBackend:
+    """Создать backend хранилища по имени из настроек"""
+    name = name or settings.DB_BACKEND
+    if name == "json":
+        from storage.backends.json_backend import JsonBackend
+        return JsonBackend()
+    if name == "sharded":
+        from storage.backends.sharded_backend import ShardedJsonBackend
+        return ShardedJsonBackend()
+    if name == "sqlite":
+        from storage.backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    raise ValueError(f"Unknown database backend: {name}")
+
+def locked(method):
+    """Выполнить метод под блокировкой хранилища"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.backend.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class Database:
-    def __init__(self):
-        self.file_path = settings.USERS_FILE
-        self._ensure_storage_dir()
-        self._init_database()
-    
-    def _ensure_storage_dir(self):
-        """Создать директорию storage если её нет"""
-        os.makedirs("storage", exist_ok=True)
-    
-    def _init_database(self):
-        """Инициализировать базу данных"""
-        initial_data = {
-            "users": {},
-            "stats": {
-                "total_users": 0,
-                "total_requests": 0,
-                "created_at": datetime.now().isoformat()
-            }
+    def __init__(self, backend: StorageBackend = None, journal: HistoryJournal = None,
+                 archive: ColdArchive = None):
+        self.backend = backend or create_backend()
+        # Холодный архив: в основном хранилище остаются только недавно активные пользователи
+        if archive is None and settings.COLD_ARCHIVE_ENABLED:
+            archive = ColdArchive()
+        self.archive = archive
+        # Внутри group_commit() фиксация откладывается до выхода из блока
+        self._deferred = 0
+        self._pending_commits = 0
+        # Вернувшиеся из архива пользователи: из архива они удаляются после ближайшего сброса
+        self._restored = set()
+        # Журнал истории нужен только хранилищу в памяти: SQLite и так пишет одну строку
+        if journal is None and settings.JOURNAL_ENABLED and self.backend.in_memory:
+            journal = HistoryJournal()
+        self.journal = journal
+        if self.journal:
+            self._recover_history()
+        self._ensure_aggregates()
+    
+    def _ensure_aggregates(self):
+        """Посчитать счетчики, если база создана до их появления"""
+        stats = self.backend.get_stats()
+        if all(name in stats for name in AGGREGATES):
+            return
+        for name, value in self._compute_aggregates().items():
+            if name not in stats:
+                self.backend.set_stat(name, value)
+        self._commit()
+        logger.info("Database aggregates initialized")
+    
+    def _recover_history(self):
+        """Доиграть хвост журнала, не попавший в последний снимок"""
+        checkpoint = self.backend.get_stats().get("journal_seq", 0)
+        self._compacted_seq = checkpoint
+        replayed = 0
+        for event in self.journal.replay(after_seq=checkpoint):
+            if event.get("type") == "seen":
+                self._apply_seen(event)
+            else:
+                self._apply_history(event)
+            replayed += 1
+        if replayed:
+            logger.info("Replayed %s events from journal", replayed)
+        # После чистой остановки сегментов нет и нумерация начинается с нуля: продолжаем
+        # ее после снимка, иначе новые события не новее checkpoint и при сбое не доигрываются
+        self.journal.last_seq = max(self.journal.last_seq, checkpoint)
+        self.compact()
+    
+    def _apply_history(self, event: Dict[str, Any]):
+        """Применить событие истории к пользователю в памяти"""
+        history_item = {
+            "command": event["command"],
+            "content": event["content"],
+            "timestamp": event["timestamp"]
         }
-        try:
-            self._save_data(initial_data)
-            logger.info("Database initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing database: {e}")
+        # Ограничиваем историю последними HISTORY_LIMIT записями
+        request_count = self.backend.append_history(event["user_id"], history_item, HISTORY_LIMIT)
+        if request_count:
+            # Обновляем общую статистику
+            self.backend.increment_stat("total_requests")
+            if request_count == 1:
+                self.backend.increment_stat("active_users")
+        if "seq" in event:
+            self.backend.set_stat("journal_seq", event["seq"])
     
-    def _load_data(self) -> Dict[str, Any]:
-        """Загрузить данные из файла"""
-        try:
-            if not os.path.exists(self.file_path):
-                # Если файла нет, создаем его с начальными данными
-                self._init_database()
-            
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if not content:
-                    # Если файл пустой, инициализируем заново
-                    logger.warning("Database file is empty, reinitializing...")
-                    self._init_database()
-                    return {"users": {}, "stats": {"total_users": 0, "total_requests": 0}}
-                
-                return json.loads(content)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Error loading database: {e}")
-            # При ошибке создаем новую базу
-            self._init_database()
-            return {"users": {}, "stats": {"total_users": 0, "total_requests": 0}}
-        except Exception as e:
-            logger.error(f"Unexpected error loading database: {e}")
-            return {"users": {}, "stats": {"total_users": 0, "total_requests": 0}}
-    
-    def _save_data(self, data: Dict[str, Any]):
-        """Сохранить данные в файл"""
+    def compact(self):
+        """Свернуть журнал в сохраненный снимок и удалить ненужные сегменты"""
+        if not self.journal:
+            return
+        # Кольцевые буферы истории уже обновлены в памяти: закрываем сегмент,
+        # сохраняем снимок вместе с номером последнего события и чистим журнал
+        self.journal.rotate()
+        checkpoint = self.backend.get_stats().get("journal_seq", 0)
+        if checkpoint > self._compacted_seq:
+            self.backend.commit()
+            if not self.flush():
+                return
+            self._compacted_seq = checkpoint
+        dropped = self.journal.drop_through(self._compacted_seq)
+        if dropped:
+            logger.info("Compacted %s journal segments", dropped)
+    
+    def _compute_aggregates(self) -> Dict[str, int]:
+        """Агрегаты по основному хранилищу и холодному архиву"""
+        aggregates = self.backend.compute_aggregates()
+        if self.archive:
+            for user_id, request_count, favorites in self.archive.summaries():
+                # После сбоя посреди переноса пользователь может оказаться в обоих местах
+                if self.backend.has_user(user_id):
+                    continue
+                aggregates["total_users"] += 1
+                aggregates["active_users"] += request_count > 0
+                aggregates["total_requests"] += request_count
+                aggregates["total_favorites"] += favorites
+        return aggregates
+    
+    def _restore_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Вернуть пользователя из холодного архива в основное хранилище"""
+        if not self.archive:
+            return None
+        user = self.archive.get(user_id)
+        if user is None:
+            return None
+        self.backend.insert_user(user)
+        self._commit()
+        # Из архива пользователь удаляется только после того, как ближайший сброс сохранит
+        # его на диск; сбрасывать сейчас нельзя - вызывающий держит блокировку
+        self._restored.add(user_id)
+        logger.info("User %s restored from cold archive", user_id)
+        return self.backend.get_user(user_id)
+    
+    def _ensure_hot(self, user_id: int) -> bool:
+        """Есть ли пользователь в основном хранилище (с возвратом из архива)"""
+        if self.backend.has_user(user_id):
+            return True
+        return self._restore_user(user_id) is not None
+    
+    def archive_inactive(self, now: datetime = None) -> int:
+        """Перенести неактивных пользователей в холодный архив, вернуть их число"""
+        if not self.archive:
+            return 0
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=settings.COLD_AFTER_DAYS)).isoformat()
+        retention = (now - timedelta(days=settings.HISTORY_RETENTION_DAYS)).isoformat()
+        with self.backend.lock:
+            user_ids = self.backend.user_ids()
+        candidates = []
+        # Проход тоже пачками и без построения словарей: между пачками читатели не ждут
+        for start in range(0, len(user_ids), ARCHIVE_SCAN_BATCH):
+            with self.backend.lock:
+                for user_id in user_ids[start:start + ARCHIVE_SCAN_BATCH]:
+                    moment = self.backend.last_active(user_id)
+                    if moment is not None and moment < cutoff:
+                        candidates.append(user_id)
+        
+        archived = 0
+        # Переносим пачками, чтобы не держать блокировку на все время прохода
+        for start in range(0, len(candidates), ARCHIVE_BATCH):
+            with self.backend.lock:
+                users = []
+                for user_id in candidates[start:start + ARCHIVE_BATCH]:
+                    user = self.backend.get_user(user_id)
+                    # Пользователь мог вернуться, пока шел проход
+                    if user is None or last_activity(user) >= cutoff:
+                        continue
+                    # Политика хранения: старая история в архив не попадает
+                    user["history"] = [item for item in user["history"] if item["timestamp"] >= retention]
+                    users.append((user, last_activity(user)))
+                # Сначала запись в архив, затем удаление из основного хранилища
+                self.archive.put_many(users)
+                for user, _ in users:
+                    self.backend.delete_user(user["user_id"])
+                self._commit()
+            archived += len(users)
+        
+        if archived:
+            self.flush()
+            logger.info("Archived %s inactive users", archived)
+        return archived
+    
+    def _commit(self):
+        """Зафиксировать изменение сейчас или в конце group_commit()"""
+        if self._deferred:
+            self._pending_commits += 1
+        else:
+            self.backend.commit()
+    
+    def _commit_pending(self):
+        """Одна фиксация для всех изменений, накопленных в group_commit()"""
+        if self.journal:
+            self.journal.sync()
+        if self._pending_commits:
+            self._pending_commits = 0
+            self.backend.commit()
+    
+    @contextmanager
+    def group_commit(self):
+        """Выполнить несколько операций под одной блокировкой и одной фиксацией"""
+        self._deferred += 1
         try:
-            # Создаем временный файл для безопасного сохранения
-            temp_file = self.file_path + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Заменяем основной файл только если запись прошла успешно
-            import shutil
-            shutil.move(temp_file, self.file_path)
-            logger.info("Database saved successfully")
-        except Exception as e:
-            logger.error(f"Error saving database: {e}")
-            # Удаляем временный файл если что-то пошло не так
-            if os.path.exists(self.file_path + '.tmp'):
-                os.remove(self.file_path + '.tmp')
-    
-    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Получить данные пользователя"""
-        data = self._load_data()
-        return data["users"].get(str(user_id))
+            with self.backend.lock:
+                yield
+        finally:
+            self._deferred -= 1
+            if not self._deferred:
+                # Запись на диск - уже без блокировки, читатели не ждут
+                self._commit_pending()
+    
+    @contextmanager
+    def session(self, user_id: int, username: str = None, first_name: str = None):
+        """Единица работы: все изменения внутри блока фиксируются одной записью при выходе"""
+        session = UserSession(user_id, username, first_name)
+        yield session
+        self.apply_session(session)
+    
+    def apply_session(self, session: UserSession) -> List[Any]:
+        """Выполнить операции сессии под одной блокировкой и одной фиксацией"""
+        with self.group_commit():
+            session.results = [getattr(self, name)(*args) for name, args in session.operations]
+        return session.results
     
+    def flush(self) -> bool:
+        """Сохранить несохраненные изменения, вернуть успех (вызывается без блокировки)"""
+        with self.backend.lock:
+            # Пользователи, вернувшиеся после этой точки, попадут уже в следующий сброс
+            restored, self._restored = self._restored, set()
+        if restored:
+            self.backend.commit()
+        flushed = self.backend.flush()
+        if restored:
+            self._release_restored(restored, flushed)
+        return flushed
+    
+    def _release_restored(self, restored: set, flushed: bool):
+        """Удалить из архива пользователей, уже сохраненных в основном хранилище"""
+        with self.backend.lock:
+            if not flushed:
+                self._restored |= restored
+                return
+            # Пользователь мог снова уйти в архив, пока шел сброс
+            self.archive.delete_many([user_id for user_id in restored if self.backend.has_user(user_id)])
+    
+    def close(self):
+        """Сохранить все изменения перед остановкой"""
+        if self.journal:
+            self.compact()
+            self.journal.close()
+        self.flush()
+        self.backend.close()
+        if self.archive:
+            self.archive.close()
+    
+    @locked
+    def get_user(self, user_id: int, restore: bool = True) -> Optional[Dict[str, Any]]:
+        """Получить данные пользователя (при restore - с возвратом из архива)"""
+        user = self.backend.get_user(user_id)
+        if user is None and restore:
+            user = self._restore_user(user_id)
+        return user
+    
+    @locked
     def create_user(self, user_id: int, username: str = None, first_name: str = None):
         """Создать нового пользователя"""
-        data = self._load_data()
         user_data = {
             "user_id": user_id,
             "username": username,
@@ -93,92 +302,151 @@ class Database:
             "request_count": 0
         }
         
-        data["users"][str(user_id)] = user_data
-        data["stats"]["total_users"] += 1
-        self._save_data(data)
-        logger.info(f"User {user_id} created")
+        self.backend.insert_user(user_data)
+        self.backend.increment_stat("total_users")
+        self._commit()
+        logger.info("User %s created", user_id)
         return user_data
     
+    @locked
+    def get_or_create_user(self, user_id: int, username: str = None, first_name: str = None) -> Dict[str, Any]:
+        """Получить пользователя, создав его при необходимости"""
+        user = self.get_user(user_id)
+        if user is None:
+            user = self.create_user(user_id, username, first_name)
+        return user
+    
+    @locked
     def update_user(self, user_id: int, updates: Dict[str, Any]):
         """Обновить данные пользователя"""
-        data = self._load_data()
-        if str(user_id) in data["users"]:
-            data["users"][str(user_id)].update(updates)
-            self._save_data(data)
-            logger.info(f"User {user_id} updated")
+        user = self.get_user(user_id)
+        if user is None:
+            return False
+        favorites_before = len(user["favorites"])
+        was_active = user["request_count"] > 0
+        if self.backend.update_user(user_id, updates):
+            # Поправляем счетчики, если обновление затронуло избранное или активность
+            if "favorites" in updates:
+                self.backend.increment_stat("total_favorites", len(updates["favorites"]) - favorites_before)
+            if "request_count" in updates:
+                is_active = updates["request_count"] > 0
+                self.backend.increment_stat("active_users", int(is_active) - int(was_active))
+            self._commit()
+            logger.info("User %s updated", user_id)
             return True
         return False
     
+    @locked
     def add_to_favorites(self, user_id: int, item: str, item_type: str):
         """Добавить элемент в избранное"""
-        user = self.get_user(user_id)
-        if user:
-            favorite_item = {
-                "content": item,
-                "type": item_type,
-                "added_at": datetime.now().isoformat()
-            }
-            user["favorites"].append(favorite_item)
-            self.update_user(user_id, {"favorites": user["favorites"]})
+        if not self._ensure_hot(user_id):
+            return False
+        favorite_item = {
+            "content": item,
+            "type": item_type,
+            "added_at": datetime.now().isoformat()
+        }
+        if self.backend.add_favorite(user_id, favorite_item):
+            self.backend.increment_stat("total_favorites")
+            self._commit()
             return True
         return False
     
+    @locked
     def remove_from_favorites(self, user_id: int, index: int):
         """Удалить элемент из избранного"""
-        user = self.get_user(user_id)
-        if user and 0 <= index < len(user["favorites"]):
-            removed_item = user["favorites"].pop(index)
-            self.update_user(user_id, {"favorites": user["favorites"]})
-            return removed_item
-        return None
+        if not self._ensure_hot(user_id):
+            return None
+        removed_item = self.backend.remove_favorite(user_id, index)
+        if removed_item:
+            self.backend.increment_stat("total_favorites", -1)
+            self._commit()
+        return removed_item
     
+    @locked
     def add_to_history(self, user_id: int, command: str, content: str):
         """Добавить запись в историю"""
-        user = self.get_user(user_id)
-        if user:
-            history_item = {
-                "command": command,
-                "content": content,
-                "timestamp": datetime.now().isoformat()
-            }
-            user["history"].append(history_item)
-            
-            # Ограничиваем историю последними 50 записями
-            if len(user["history"]) > 50:
-                user["history"] = user["history"][-50:]
-            
-            user["request_count"] += 1
-            self.update_user(user_id, {
-                "history": user["history"],
-                "request_count": user["request_count"]
-            })
-            
-            # Обновляем общую статистику
-            data = self._load_data()
-            data["stats"]["total_requests"] += 1
-            self._save_data(data)
-    
-    def get_stats(self) -> Dict[str, Any]:
-        """Получить статистику"""
-        data = self._load_data()
-        stats = data.get("stats", {})
-        
-        # Добавляем дополнительную статистику
-        users = data.get("users", {})
-        active_users = len([u for u in users.values() if u.get("request_count", 0) > 0])
-        total_favorites = sum(len(u.get("favorites", [])) for u in users.values())
+        event = {
+            "user_id": user_id,
+            "command": command,
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        }
+        if not self._ensure_hot(user_id):
+            return
+        if self.journal:
+            # Событие дописывается в журнал, снимок со всей историей сохранит компактор
+            self.journal.append(event, sync=not self._deferred)
+            self._apply_history(event)
+            return
         
-        stats.update({
-            "active_users": active_users,
-            "total_favorites": total_favorites
-        })
+        self._apply_history(event)
+        self._commit()
+    
+    @locked
+    def get_seen(self, user_id: int) -> SeenFilter:
+        """Фильтр контента, который пользователь уже видел"""
+        return SeenFilter(self.backend.get_seen(user_id))
+    
+    @locked
+    def mark_seen(self, user_id: int, content: str) -> bool:
+        """Отметить контент показанным пользователю (размер фильтра не растет)"""
+        if not self._ensure_hot(user_id):
+            return False
+        event = {"type": "seen", "user_id": user_id, "content": content}
+        if self.journal:
+            # Как и история: только событие в журнале, без отдельной перезаписи снимка -
+            # фильтр сохранит компактор
+            self.journal.append(event, sync=not self._deferred)
+            return self._apply_seen(event)
         
-        return stats
+        if not self._apply_seen(event):
+            return False
+        self._commit()
+        return True
+    
+    def _apply_seen(self, event: Dict[str, Any]) -> bool:
+        """Добавить контент в фильтр показанного пользователю"""
+        seen = SeenFilter(self.backend.get_seen(event["user_id"]))
+        seen.add(event["content"])
+        applied = self.backend.set_seen(event["user_id"], seen.to_bytes())
+        if "seq" in event:
+            self.backend.set_stat("journal_seq", event["seq"])
+        return applied
+    
+    @locked
+    def increment_stat(self, name: str, delta: int = 1):
+        """Увеличить общий счетчик статистики"""
+        self.backend.increment_stat(name, delta)
+        self._commit()
+    
+    @locked
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить статистику (O(1): только готовые счетчики)"""
+        return self.backend.get_stats()
+    
+    @locked
+    def check_stats(self, repair: bool = True) -> Dict[str, Dict[str, int]]:
+        """Пересчитать счетчики с нуля и вернуть расхождения вида {name: {stored, actual}}"""
+        stats = self.backend.get_stats()
+        actual = self._compute_aggregates()
+        drift = {
+            name: {"stored": stats.get(name, 0), "actual": value}
+            for name, value in actual.items()
+            if stats.get(name, 0) != value
+        }
+        if drift:
+            logger.warning("Stats drift detected: %s", drift)
+            if repair:
+                for name in drift:
+                    self.backend.set_stat(name, actual[name])
+                self._commit()
+        return drift
     
+    @locked
     def get_all_users(self) -> List[Dict[str, Any]]:
         """Получить всех пользователей"""
-        data = self._load_data()
-        return list(data["users"].values())
+        return self.backend.get_all_users()
 
 # Глобальный экземпляр базы данных
 db = Database()
\ No newline at end of file
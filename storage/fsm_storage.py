@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_expires ON fsm(expires_at);
+"""
+
+# Запись кэша: состояние, данные; пустая запись тоже кэшируется - большинство сообщений без состояния
+EMPTY = (None, {})
+
+def storage_key(key: StorageKey) -> str:
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище aiogram в файле SQLite: состояния переживают перезапуск и общие для процессов.
+    
+    Чтение идет из кэша в памяти; PRAGMA data_version показывает, что файл изменило
+    другое соединение, и тогда кэш сбрасывается. Запись ждет блокировку файла, пока пишет
+    другой процесс, поэтому выполняется в пуле потоков через отдельное соединение.
+    Каждая запись продлевает срок жизни состояния на ttl секунд, брошенные состояния
+    по истечении считаются пустыми и удаляются.
+    """
+    
+    def __init__(self, file_path: str = None,
+                 ttl: float = settings.FSM_STATE_TTL,
+                 max_cached: int = settings.FSM_CACHE_MAX_ENTRIES,
+                 sweep_interval: float = settings.FSM_SWEEP_INTERVAL):
+        self.file_path = file_path or settings.FSM_STORAGE_FILE
+        self.ttl = ttl
+        self.max_cached = max_cached
+        self.sweep_interval = sweep_interval
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        # Транзакции открываются явно; timeout - ожидание блокировки записи другим процессом
+        self._write_conn = sqlite3.connect(self.file_path, timeout=settings.FSM_BUSY_TIMEOUT,
+                                           isolation_level=None, check_same_thread=False)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_conn.executescript(SCHEMA)
+        # Записи из пула потоков идут по одной
+        self._write_lock = threading.Lock()
+        # Соединение для чтения из event loop: в WAL чтение не ждет пишущих
+        self._conn = sqlite3.connect(self.file_path, isolation_level=None)
+        # key -> (state, data, expires_at), от давно использованных к недавним
+        self._cache: "OrderedDict[str, Tuple[Optional[str], Dict[str, Any], float]]" = OrderedDict()
+        self._data_version = self._read_data_version()
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expired = 0
+        self._sweep(time.time())
+    
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def _check_version(self):
+        """Сбросить кэш, если файл изменило другое соединение (другой процесс или своя запись)"""
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            if self._cache:
+                self._cache.clear()
+                self.invalidations += 1
+    
+    def _remember(self, key: str, state: Optional[str], data: Dict[str, Any], expires_at: float):
+        self._cache[key] = (state, data, expires_at)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+    
+    def _load(self, key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Состояние и данные из кэша, при промахе - из файла"""
+        now = time.time()
+        self._check_version()
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            row = self._conn.execute(
+                "SELECT state, data, expires_at FROM fsm WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                entry = (None, {}, float("inf"))
+            else:
+                entry = (row[0], json.loads(row[1]), row[2])
+            self._remember(key, *entry)
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        state, data, expires_at = entry
+        if expires_at <= now:
+            # Брошенное состояние: строку удалит очистка
+            self._cache[key] = (None, {}, float("inf"))
+            self.expired += 1
+            return EMPTY
+        return state, data
+    
+    def _write(self, key: str, column: str, value: Optional[str]) -> tuple:
+        """Изменить одно поле записи, не затирая второе, которое мог записать другой процесс"""
+        now = time.time()
+        conn = self._write_conn
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Истекшая запись не должна ожить вместе со вторым полем
+                conn.execute("DELETE FROM fsm WHERE key = ? AND expires_at <= ?", (key, now))
+                conn.execute(
+                    f"INSERT INTO fsm (key, {column}, expires_at) VALUES (?, ?, ?) "
+                    f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, expires_at = excluded.expires_at",
+                    (key, value, now + self.ttl)
+                )
+                row = conn.execute("SELECT state, data, expires_at FROM fsm WHERE key = ?", (key,)).fetchone()
+                if row[0] is None and row[1] == "{}":
+                    # Пустая запись (state.clear()) не хранится
+                    conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+                    row = (None, "{}", float("inf"))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+        return row[0], json.loads(row[1]), row[2]
+    
+    def _sweep(self, now: float):
+        """Удалить из файла истекшие состояния"""
+        self._last_sweep = now
+        removed = self._write_conn.execute("DELETE FROM fsm WHERE expires_at <= ?", (now,)).rowcount
+        if removed:
+            logger.info("FSM storage removed %s expired states", removed)
+    
+    async def _set(self, key: StorageKey, column: str, value: Optional[str]):
+        """Запись в пуле потоков: ожидание блокировки файла не останавливает event loop"""
+        name = storage_key(key)
+        entry = await asyncio.to_thread(self._write, name, column, value)
+        self._remember(name, *entry)
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._set(key, "state", state.state if isinstance(state, State) else state)
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._load(storage_key(key))[0]
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._set(key, "data", json.dumps(data, ensure_ascii=False))
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._load(storage_key(key))[1].copy()
+    
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        name = storage_key(key)
+        state, current, expires_at = await asyncio.to_thread(self._merge, name, data)
+        self._remember(name, state, current, expires_at)
+        return current.copy()
+    
+    def _merge(self, name: str, data: Dict[str, Any]) -> tuple:
+        """Чтение и запись в одной транзакции: одновременное обновление из другого процесса не теряется"""
+        now = time.time()
+        conn = self._write_conn
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM fsm WHERE key = ? AND expires_at <= ?", (name, now))
+                row = conn.execute("SELECT state, data FROM fsm WHERE key = ?", (name,)).fetchone()
+                state, current = (row[0], json.loads(row[1])) if row is not None else EMPTY
+                current = dict(current, **data)
+                conn.execute(
+                    "INSERT INTO fsm (key, data, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                    (name, json.dumps(current, ensure_ascii=False), now + self.ttl)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return state, current, now + self.ttl
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "expired": self.expired
+        }
+    
+    async def close(self) -> None:
+        logger.info("FSM storage stats: %s", self.stats())
+        self._conn.close()
+        with self._write_lock:
+            self._write_conn.close()
\ No newline at end of file
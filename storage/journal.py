@@ -0,0 +1,102 @@
+import json
+import os
+from typing import Dict, Any, Iterator, List, Optional
+from config.settings import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SEGMENT_PREFIX = "history-"
+SEGMENT_SUFFIX = ".jsonl"
+
+class HistoryJournal:
+    """Сегментированный append-only журнал событий истории и показанного контента (JSONL)"""
+    
+    def __init__(self, directory: str = None, segment_max_bytes: int = settings.JOURNAL_SEGMENT_MAX_BYTES):
+        self.directory = directory or settings.JOURNAL_DIR
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.last_seq = 0
+        self._active = None
+        self._active_path: Optional[str] = None
+        self._active_size = 0
+    
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}")
+    
+    def segments(self) -> List[str]:
+        """Все сегменты журнала в порядке записи"""
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+    
+    def _first_seq(self, path: str) -> int:
+        return int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+    
+    def replay(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """Прочитать события с номером больше after_seq"""
+        for path in self.segments():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная строка в хвосте после аварийного завершения
+                        logger.warning("Skipping torn journal record in %s", path)
+                        continue
+                    self.last_seq = max(self.last_seq, event["seq"])
+                    if event["seq"] > after_seq:
+                        yield event
+    
+    def append(self, event: Dict[str, Any], sync: bool = True) -> int:
+        """Дописать событие в активный сегмент, вернуть его номер"""
+        self.last_seq += 1
+        event["seq"] = self.last_seq
+        if self._active is None:
+            self._open_segment(self.last_seq)
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        self._active.write(line)
+        if sync:
+            self.sync()
+        self._active_size += len(line.encode('utf-8'))
+        if self._active_size >= self.segment_max_bytes:
+            self.rotate()
+        return self.last_seq
+    
+    def _open_segment(self, first_seq: int):
+        self._active_path = self._segment_path(first_seq)
+        self._active = open(self._active_path, 'a', encoding='utf-8')
+        self._active_size = 0
+    
+    def sync(self):
+        """Отдать дописанные строки ОС (при групповой фиксации - один раз на пачку)"""
+        if self._active is not None:
+            self._active.flush()
+    
+    def rotate(self):
+        """Закрыть активный сегмент: следующее событие начнет новый"""
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+            self._active_path = None
+            self._active_size = 0
+    
+    def drop_through(self, seq: int) -> int:
+        """Удалить закрытые сегменты, все события которых не новее seq"""
+        segments = self.segments()
+        dropped = 0
+        for path, next_path in zip(segments, segments[1:] + [None]):
+            if path == self._active_path:
+                break
+            # Последнее событие сегмента - перед первым событием следующего
+            last_in_segment = self._first_seq(next_path) - 1 if next_path else self.last_seq
+            if last_in_segment > seq:
+                break
+            os.remove(path)
+            dropped += 1
+        return dropped
+    
+    def close(self):
+        self.rotate()
\ No newline at end of file
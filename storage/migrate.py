@@ -0,0 +1,58 @@
+"""Одноразовая миграция пользователей из users.json в SQLite.
+
+Запуск из корня проекта: python -m storage.migrate [--source storage/users.json] [--target storage/users.db]
+"""
+import argparse
+import json
+import os
+import sys
+from config.settings import settings
+from storage.backends.sqlite_backend import SQLiteBackend
+from utils.logger import logger
+
+def migrate(source: str, target: str) -> int:
+    """Перенести пользователей и статистику из JSON-файла в SQLite, вернуть число пользователей"""
+    with open(source, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    backend = SQLiteBackend(target)
+    try:
+        if backend.get_stats()["total_users"]:
+            raise RuntimeError(f"Target database {target} is not empty")
+        
+        users = data.get("users", {})
+        for user in users.values():
+            backend.insert_user(user)
+        
+        stats = data.get("stats", {})
+        backend.increment_stat("total_users", stats.get("total_users", len(users)))
+        backend.increment_stat("total_requests", stats.get("total_requests", 0))
+        if stats.get("created_at"):
+            backend.set_stat("created_at", stats["created_at"])
+        # Вся миграция - одна транзакция
+        backend.commit()
+    finally:
+        backend.close()
+    
+    logger.info("Migrated %s users from %s to %s", len(users), source, target)
+    return len(users)
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграция users.json -> SQLite")
+    parser.add_argument("--source", default=settings.USERS_FILE)
+    parser.add_argument("--target", default=settings.SQLITE_FILE)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.source):
+        print(f"Файл {args.source} не найден")
+        sys.exit(1)
+    
+    try:
+        count = migrate(args.source, args.target)
+    except RuntimeError as e:
+        print(f"Миграция отменена: {e}")
+        sys.exit(1)
+    print(f"Перенесено пользователей: {count}. Установите DB_BACKEND = \"sqlite\" в config/settings.py")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,202 @@
+import base64
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Iterator, Optional, Union
+
+# Время хранится целым числом микросекунд от эпохи вместо ISO-строки
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+Timestamp = Union[int, str, None]
+
+def to_timestamp(value: str) -> Timestamp:
+    """ISO-строка -> микросекунды от эпохи (нестандартные значения хранятся как есть)"""
+    if not isinstance(value, str):
+        return value
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    # Строки с часовым поясом или в другом написании не переживут обратного
+    # преобразования без потерь - оставляем их строками
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return value
+    return (moment - EPOCH) // MICROSECOND
+
+def from_timestamp(value: Timestamp) -> str:
+    """Микросекунды от эпохи -> ISO-строка в исходном формате"""
+    if isinstance(value, int):
+        return (EPOCH + value * MICROSECOND).isoformat()
+    return value
+
+def last_activity(user: Dict[str, Any]) -> str:
+    """Время последней активности пользователя (ISO-строка)"""
+    moments = [user.get("created_at") or ""]
+    moments += [item["timestamp"] for item in user.get("history", [])]
+    moments += [item["added_at"] for item in user.get("favorites", [])]
+    return max(moments)
+
+def encode_seen(data: Optional[bytes]) -> Optional[str]:
+    """Фильтр просмотренного -> строка для users.json"""
+    return base64.b64encode(data).decode("ascii") if data else None
+
+def decode_seen(value: Optional[str]) -> Optional[bytes]:
+    return base64.b64decode(value) if value else None
+
+def intern(value: Any) -> Any:
+    """Одна копия строки на все записи (команды и типы повторяются постоянно)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+class HistoryEntry:
+    """Запись истории запросов"""
+    
+    __slots__ = ("command", "content", "timestamp")
+    
+    def __init__(self, command: str, content: str, timestamp: Timestamp):
+        self.command = intern(command)
+        self.content = content
+        self.timestamp = timestamp
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistoryEntry":
+        return cls(data.get("command"), data.get("content"), to_timestamp(data.get("timestamp")))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "command": self.command,
+            "content": self.content,
+            "timestamp": from_timestamp(self.timestamp)
+        }
+
+class FavoriteItem:
+    """Элемент избранного"""
+    
+    __slots__ = ("content", "type", "added_at")
+    
+    def __init__(self, content: str, item_type: str, added_at: Timestamp):
+        self.content = content
+        self.type = intern(item_type)
+        self.added_at = added_at
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FavoriteItem":
+        return cls(data.get("content"), data.get("type"), to_timestamp(data.get("added_at")))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "content": self.content,
+            "type": self.type,
+            "added_at": from_timestamp(self.added_at)
+        }
+
+class HistoryRing:
+    """Кольцевой буфер последних записей: добавление за O(1) без сдвига списка"""
+    
+    __slots__ = ("_items", "_start")
+    
+    def __init__(self, items: List[HistoryEntry] = None):
+        self._items = list(items or [])
+        # Индекс самой старой записи, когда буфер заполнен
+        self._start = 0
+    
+    def append(self, entry: HistoryEntry, limit: int):
+        """Добавить запись, вытеснив самую старую при заполнении"""
+        items = self._items
+        if len(items) > limit:
+            # Лимит уменьшили: оставляем только последние записи
+            self._items = items = list(self)[-limit:]
+            self._start = 0
+        if len(items) < limit:
+            items.append(entry)
+            return
+        items[self._start] = entry
+        self._start = (self._start + 1) % limit
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        """Записи от старых к новым"""
+        items, start = self._items, self._start
+        for index in range(start, len(items)):
+            yield items[index]
+        for index in range(start):
+            yield items[index]
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [entry.to_dict() for entry in self]
+
+class UserRecord:
+    """Компактная запись пользователя для хранилища в памяти"""
+    
+    __slots__ = ("user_id", "username", "first_name", "favorites", "history",
+                 "created_at", "request_count", "seen", "extra")
+    
+    # Поля, которые хранятся в слотах, остальные ключи попадают в extra
+    FIELDS = ("user_id", "username", "first_name", "favorites", "history", "created_at", "request_count")
+    
+    def __init__(self, user_id: int, username: str = None, first_name: str = None):
+        self.user_id = user_id
+        self.username = username
+        self.first_name = first_name
+        self.favorites: List[FavoriteItem] = []
+        self.history = HistoryRing()
+        self.created_at: Timestamp = None
+        self.request_count = 0
+        # Фильтр показанного контента (storage.seen_filter), байты фиксированного размера
+        self.seen: Optional[bytes] = None
+        self.extra: Dict[str, Any] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserRecord":
+        record = cls(data.get("user_id"))
+        record.update(data)
+        return record
+    
+    def update(self, updates: Dict[str, Any]):
+        """Применить изменения в формате словаря пользователя"""
+        for key, value in updates.items():
+            if key == "favorites":
+                self.favorites = [FavoriteItem.from_dict(item) for item in value]
+            elif key == "history":
+                self.history = HistoryRing(HistoryEntry.from_dict(item) for item in value)
+            elif key == "created_at":
+                self.created_at = to_timestamp(value)
+            elif key == "seen":
+                self.seen = decode_seen(value)
+            elif key in self.FIELDS:
+                setattr(self, key, value)
+            else:
+                # Неизвестные ключи сохраняются, чтобы файл переживал загрузку без потерь
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+    
+    def last_active(self) -> str:
+        """То же, что last_activity(), но прямо по полям записи, без построения словаря"""
+        moments = [self.created_at]
+        moments += [entry.timestamp for entry in self.history]
+        moments += [item.added_at for item in self.favorites]
+        # Микросекунды сравниваются числами, в ISO-строку переводится только самое позднее
+        numbers = [moment for moment in moments if isinstance(moment, int)]
+        strings = [moment for moment in moments if isinstance(moment, str)]
+        if numbers:
+            strings.append(from_timestamp(max(numbers)))
+        return max(strings, default="")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь в формате users.json"""
+        data = {
+            "user_id": self.user_id,
+            "username": self.username,
+            "first_name": self.first_name,
+            "favorites": [item.to_dict() for item in self.favorites],
+            "history": self.history.to_list(),
+            "created_at": from_timestamp(self.created_at),
+            "request_count": self.request_count
+        }
+        if self.seen:
+            data["seen"] = encode_seen(self.seen)
+        if self.extra:
+            data.update(self.extra)
+        return data
\ No newline at end of file
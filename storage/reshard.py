@@ -0,0 +1,65 @@
+"""Перераскладка пользователей по новому числу шардов.
+
+Бот на время перераскладки должен быть остановлен.
+Запуск из корня проекта: python -m storage.reshard --shards 32 [--directory storage/shards] [--source storage/users.json]
+Без --source читаются текущие шарды, с --source - один файл users.json.
+"""
+import argparse
+import os
+import shutil
+import sys
+from config.settings import settings
+from storage.backends.json_backend import JsonBackend
+from storage.backends.sharded_backend import ShardedJsonBackend, STATS_FILE
+from utils.logger import logger
+
+def reshard(directory: str, shards: int, source: str = None) -> int:
+    """Разложить пользователей по shards файлам в directory, вернуть число пользователей"""
+    current = JsonBackend(source) if source else ShardedJsonBackend(directory)
+    
+    # Новая раскладка собирается рядом и подменяет старую только целиком
+    new_directory = directory.rstrip(os.sep) + ".new"
+    shutil.rmtree(new_directory, ignore_errors=True)
+    target = ShardedJsonBackend(new_directory, shards)
+    count = 0
+    for user in current.iter_users():
+        target.insert_user(user)
+        count += 1
+    for name, value in current.get_stats().items():
+        target.set_stat(name, value)
+    target.commit()
+    if not target.flush():
+        raise RuntimeError(f"Failed to write shards to {new_directory}")
+    
+    old_directory = directory.rstrip(os.sep) + ".old"
+    if os.path.exists(directory):
+        os.replace(directory, old_directory)
+    os.replace(new_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+    
+    logger.info("Resharded %s users into %s shards in %s", count, shards, directory)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Перераскладка пользователей по шардам")
+    parser.add_argument("--shards", type=int, default=settings.DB_SHARDS)
+    parser.add_argument("--directory", default=settings.SHARDS_DIR)
+    parser.add_argument("--source", help="взять пользователей из одного JSON-файла")
+    args = parser.parse_args()
+    
+    if args.shards < 1:
+        print("Число шардов должно быть положительным")
+        sys.exit(1)
+    if args.source and not os.path.exists(args.source):
+        print(f"Файл {args.source} не найден")
+        sys.exit(1)
+    if not args.source and not os.path.exists(os.path.join(args.directory, STATS_FILE)):
+        print(f"Шарды в {args.directory} не найдены")
+        sys.exit(1)
+    
+    count = reshard(args.directory, args.shards, args.source)
+    print(f"Разложено пользователей: {count} по {args.shards} шардам. "
+          f"Установите DB_BACKEND = \"sharded\" и DB_SHARDS = {args.shards} в config/settings.py")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
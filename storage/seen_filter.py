@@ -0,0 +1,64 @@
+import hashlib
+import math
+from typing import Optional, Tuple
+from config.settings import settings
+
+def filter_layout(capacity: int, fpr: float) -> Tuple[int, int]:
+    """Размер одного поколения фильтра Блума в байтах и число хеш-функций"""
+    bits = math.ceil(-capacity * math.log(fpr) / math.log(2) ** 2)
+    size = (bits + 7) // 8
+    hashes = max(1, round(size * 8 / capacity * math.log(2)))
+    return size, hashes
+
+class SeenFilter:
+    """Показанный пользователю контент: два поколения фильтра Блума фиксированного размера.
+    
+    В текущее поколение добавляется до capacity элементов, затем оно становится
+    предыдущим, а прежнее предыдущее сбрасывается - так фильтр помнит последние
+    capacity..2*capacity элементов; ложное срабатывание - не чаще 2*fpr (по fpr на поколение).
+    Формат: 2 байта счетчика текущего поколения, текущее поколение, предыдущее.
+    """
+    
+    __slots__ = ("capacity", "size", "hashes", "_data")
+    
+    def __init__(self, data: Optional[bytes] = None,
+                 capacity: int = settings.SEEN_FILTER_CAPACITY,
+                 fpr: float = settings.SEEN_FILTER_FPR):
+        self.capacity = capacity
+        self.size, self.hashes = filter_layout(capacity, fpr)
+        # Сохраненный фильтр с другими параметрами не читается - начинаем заново
+        if data is None or len(data) != 2 + 2 * self.size:
+            data = bytes(2 + 2 * self.size)
+        self._data = bytearray(data)
+    
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        # Двойное хеширование: k позиций из двух 64-битных хешей
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        bits = self.size * 8
+        for index in range(self.hashes):
+            yield (first + index * second) % bits
+    
+    def _contains(self, offset: int, positions) -> bool:
+        data = self._data
+        return all(data[offset + position // 8] & (1 << position % 8) for position in positions)
+    
+    def __contains__(self, item: str) -> bool:
+        positions = list(self._positions(item))
+        return self._contains(2, positions) or self._contains(2 + self.size, positions)
+    
+    def add(self, item: str) -> None:
+        count = int.from_bytes(self._data[:2], "little")
+        if count >= self.capacity:
+            # Текущее поколение заполнено: оно становится предыдущим
+            current = self._data[2:2 + self.size]
+            self._data[2 + self.size:] = current
+            self._data[2:2 + self.size] = bytes(self.size)
+            count = 0
+        for position in self._positions(item):
+            self._data[2 + position // 8] |= 1 << position % 8
+        self._data[:2] = (count + 1).to_bytes(2, "little")
+    
+    def to_bytes(self) -> bytes:
+        return bytes(self._data)
\ No newline at end of file
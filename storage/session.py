@@ -0,0 +1,36 @@
+from typing import List, Any, Tuple
+
+class UserSession:
+    """Единица работы над одним пользователем: операции копятся и фиксируются одной записью"""
+    
+    def __init__(self, user_id: int, username: str = None, first_name: str = None):
+        self.user_id = user_id
+        self.username = username
+        self.first_name = first_name
+        self.operations: List[Tuple[str, tuple]] = []
+        # Результаты операций в порядке добавления (заполняются после фиксации)
+        self.results: List[Any] = []
+    
+    def get_or_create(self):
+        """Создать пользователя, если его еще нет"""
+        self.operations.append(("get_or_create_user", (self.user_id, self.username, self.first_name)))
+    
+    def add_history(self, command: str, content: str):
+        """Добавить запись в историю"""
+        self.operations.append(("add_to_history", (self.user_id, command, content)))
+    
+    def mark_seen(self, content: str):
+        """Отметить контент показанным пользователю"""
+        self.operations.append(("mark_seen", (self.user_id, content)))
+    
+    def add_favorite(self, item: str, item_type: str):
+        """Добавить элемент в избранное"""
+        self.operations.append(("add_to_favorites", (self.user_id, item, item_type)))
+    
+    def remove_favorite(self, index: int):
+        """Удалить элемент из избранного"""
+        self.operations.append(("remove_from_favorites", (self.user_id, index)))
+    
+    def increment_stat(self, name: str, delta: int = 1):
+        """Увеличить общий счетчик статистики"""
+        self.operations.append(("increment_stat", (name, delta)))
\ No newline at end of file
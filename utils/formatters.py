@@ -73,6 +73,18 @@ def format_stats(stats: Dict[str, Any]) -> str:
     
     return formatted
 
+def format_stats_check(drift: Dict[str, Dict[str, int]]) -> str:
+    """Форматировать результат проверки счетчиков статистики"""
+    if not drift:
+        return "✅ Счетчики статистики совпадают с данными"
+    
+    formatted = "⚠️ **Найдены расхождения (исправлены):**\n\n"
+    for name, values in drift.items():
+        # Имя счетчика - в `code`: подчеркивания в нем Markdown принял бы за курсив
+        formatted += f"• `{name}`: было {values['stored']}, стало {values['actual']}\n"
+    
+    return formatted
+
 def format_prediction_result(prediction_data: Dict[str, Any], prediction_type: str) -> str:
     """Форматировать результат предсказания"""
     name = prediction_data.get("name", "").title()
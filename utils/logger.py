@@ -1,21 +1,95 @@
+import atexit
+import gzip
+import itertools
 import logging
 import os
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from config.settings import settings
 
+class AsyncQueueHandler(QueueHandler):
+    """Кладет запись в очередь без форматирования: сообщение собирает поток записи логов.
+    Если очередь переполнена, запись отбрасывается - event loop никогда не ждет диск"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class SamplingFilter(logging.Filter):
+    """Пропускает каждую n-ю запись уровня ниже WARNING (отдельный счет на каждый шаблон сообщения)"""
+    
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counters = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if not self.every:
+            return False
+        counter = self._counters.get(record.msg)
+        if counter is None:
+            counter = self._counters[record.msg] = itertools.count()
+        return next(counter) % self.every == 0
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+def _gzip_rotator(source: str, dest: str):
+    """Сжать закрытый файл лога при ротации"""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def _file_handler() -> RotatingFileHandler:
+    """Файл лога не больше LOG_MAX_BYTES, старые части сжимаются в bot.log.N.gz"""
+    handler = RotatingFileHandler(settings.LOG_FILE, maxBytes=settings.LOG_MAX_BYTES,
+                                  backupCount=settings.LOG_BACKUP_COUNT, encoding='utf-8')
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
 def setup_logger():
     # Создаем директорию для логов если её нет
     os.makedirs("logs", exist_ok=True)
     
-    # Настройка логгера
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(settings.LOG_FILE, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
-    
-    return logging.getLogger(__name__)
+    # Запись в файл и консоль идет в отдельном потоке, event loop только кладет запись в очередь
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [_file_handler(), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # При выходе дописываем все, что осталось в очереди
+    atexit.register(listener.stop)
+    
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(AsyncQueueHandler(log_queue))
+    
+    # Уровни отдельных логгеров (модули проекта и библиотеки)
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+    # Выборка частых событий: фильтр логгера отбрасывает запись до постановки в очередь
+    for name, rate in settings.LOG_SAMPLING.items():
+        logging.getLogger(name).addFilter(SamplingFilter(rate))
+    
+    return logging.getLogger("bot")
+
+def get_logger(name: str) -> logging.Logger:
+    """Логгер модуля: уровень и выборка настраиваются по имени в LOG_LEVELS и LOG_SAMPLING"""
+    return logging.getLogger(name)
 
 logger = setup_logger()
\ No newline at end of file